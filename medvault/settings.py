@@ -71,6 +71,34 @@ MEDIA_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.getenv('MEDIA_ROOT', '../
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# OCR preprocessing (crop to content, deskew; optional binarize/denoise)
+OCR_PREPROCESS = os.getenv('OCR_PREPROCESS', '1') == '1'
+OCR_BINARIZE = os.getenv('OCR_BINARIZE', '0') == '1'
+OCR_DENOISE = os.getenv('OCR_DENOISE', '0') == '1'
+# Per-line angle classifier: 'auto' skips it on pages found upright, 'always', 'never'
+OCR_ANGLE_CLS = os.getenv('OCR_ANGLE_CLS', 'auto')
+
+# Rendering / confidence. Doc types listed in OCR_TWO_TIER_DOC_TYPES (e.g. 'default')
+# get a fast OCR_FAST_DPI pass; lines below OCR_REOCR_CONF are re-read from OCR_DPI
+# renders of just the page regions around them. Opt-in until `bench_ocr --compare
+# two-tier` shows a win on your corpus with the real models.
+OCR_DPI = int(os.getenv('OCR_DPI', '300'))
+OCR_FAST_DPI = int(os.getenv('OCR_FAST_DPI', '150'))
+OCR_TWO_TIER_DOC_TYPES = [t.strip() for t in os.getenv('OCR_TWO_TIER_DOC_TYPES', '').split(',') if t.strip()]
+OCR_REOCR_CONF = float(os.getenv('OCR_REOCR_CONF', '0.85'))
+OCR_DROP_SCORE = float(os.getenv('OCR_DROP_SCORE', '0.5'))
+
+# Recognition batching (opt-in, OCR_BATCH_RECOGNITION=1): line crops from all pages
+# (and concurrent documents) are recognized together in batches of up to
+# OCR_REC_BATCH_SIZE, waiting at most OCR_BATCH_WAIT_MS for a batch to fill. Turn it
+# on once `bench_ocr --compare batching` shows a gain with the real models.
+OCR_BATCH_RECOGNITION = os.getenv('OCR_BATCH_RECOGNITION', '0') == '1'
+OCR_REC_BATCH_SIZE = int(os.getenv('OCR_REC_BATCH_SIZE', '64'))
+OCR_BATCH_WAIT_MS = float(os.getenv('OCR_BATCH_WAIT_MS', '10'))
+
+# Medication vocabulary for post-summarization normalization (TSV: canonical<TAB>alias|alias)
+MED_VOCAB_PATH = os.getenv('MED_VOCAB_PATH', str(BASE_DIR / 'summarizer' / 'data' / 'med_vocab.tsv'))
+
 # LLM/OCR config
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
@@ -80,6 +108,11 @@ OPENAI_MAX_TOKENS = int(os.getenv('OPENAI_MAX_TOKENS', '900'))
 # LLM provider switch
 LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'openai')
 
+# LLM request coalescing: identical in-flight prompts share one call; successful
+# results are cached for LLM_CACHE_TTL seconds (0 disables), up to LLM_CACHE_SIZE entries
+LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', '600'))
+LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', '256'))
+
 # Hugging Face
 HF_API_KEY = os.getenv('HF_API_KEY', '')
 HF_MODEL_ID = os.getenv('HF_MODEL_ID', 'Qwen/Qwen2.5-7B-Instruct')
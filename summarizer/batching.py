@@ -0,0 +1,113 @@
+# summarizer/batching.py
+# Cross-page / cross-document batching for the OCR text recognizer.
+import threading, time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class RecognitionBatcher:
+    """
+    Gathers text-line crops submitted from any thread (all pages of a document, or
+    several documents processed concurrently) into batches of up to `max_batch`
+    crops, waiting at most `max_wait_ms` for a batch to fill. A single worker
+    thread runs the batch through `classify` (crops that asked for it) and
+    `recognize`, then scatters the (text, conf) results back to each submitter
+    in the order its crops were given.
+
+    `lock` guards the underlying engine; callers using the same engine directly
+    (e.g. for detection) must hold it too.
+    """
+
+    def __init__(self, recognize: Callable[[List[Any]], Sequence[Tuple[str, float]]],
+                 classify: Optional[Callable[[List[Any]], List[Any]]] = None,
+                 max_batch: int = 64, max_wait_ms: float = 10.0,
+                 lock: Optional[threading.Lock] = None):
+        self._recognize = recognize
+        self._classify = classify
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.lock = lock or threading.Lock()
+        self._cond = threading.Condition()
+        self._queue: List[Tuple[List[Any], bool, Future]] = []
+        self._pending = 0
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {"requests": 0, "crops": 0, "batches": 0}
+
+    def submit(self, crops: Sequence[Any], cls: bool = False) -> Future:
+        """Queues crops; the Future resolves to [(text, conf), ...] in the same order."""
+        fut: Future = Future()
+        if not crops:
+            fut.set_result([])
+            return fut
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="ocr-rec-batcher", daemon=True)
+                self._thread.start()
+            self._queue.append((list(crops), cls, fut))
+            self._pending += len(crops)
+            self._cond.notify()
+        return fut
+
+    def recognize(self, crops: Sequence[Any], cls: bool = False) -> List[Tuple[str, float]]:
+        return self.submit(crops, cls).result()
+
+    def _wait_for_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = time.monotonic() + self.max_wait
+            while self._pending < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+    def _take_batch(self) -> List[Tuple[List[Any], bool, Future]]:
+        with self._cond:
+            # Whole requests only; one oversized request still goes out on its own
+            batch, n = [], 0
+            while self._queue and (not batch or n + len(self._queue[0][0]) <= self.max_batch):
+                item = self._queue.pop(0)
+                batch.append(item)
+                n += len(item[0])
+            self._pending -= n
+            return batch
+
+    def _run(self):
+        while True:
+            self._wait_for_batch()
+            # The batch is taken only once the engine is free, so crops queued while
+            # someone else (e.g. a detector) held the lock join it.
+            with self.lock:
+                batch = self._take_batch()
+                try:
+                    results = self._process(batch)
+                except BaseException as e:
+                    for _, _, fut in batch:
+                        fut.set_exception(e)
+                    continue
+            offset = 0
+            for crops, _, fut in batch:
+                fut.set_result(results[offset:offset + len(crops)])
+                offset += len(crops)
+
+    def _process(self, batch: List[Tuple[List[Any], bool, Future]]) -> List[Tuple[str, float]]:
+        # Caller holds self.lock
+        crops = [c for req_crops, _, _ in batch for c in req_crops]
+        need_cls = [i for i, (req_crops, cls, _) in enumerate(batch) if cls]
+        results: List[Tuple[str, float]] = []
+        if self._classify is not None and need_cls:
+            offsets, idx = [0], []
+            for req_crops, _, _ in batch:
+                offsets.append(offsets[-1] + len(req_crops))
+            for i in need_cls:
+                idx.extend(range(offsets[i], offsets[i + 1]))
+            rotated = self._classify([crops[i] for i in idx])
+            for i, c in zip(idx, rotated):
+                crops[i] = c
+        for s in range(0, len(crops), self.max_batch):
+            results.extend(self._recognize(crops[s:s + self.max_batch]))
+        self.stats["requests"] += len(batch)
+        self.stats["crops"] += len(crops)
+        self.stats["batches"] += 1
+        return results
@@ -0,0 +1,110 @@
+# summarizer/evidence.py
+# Per-document BM25 index over the chunks sent to the LLM. Built at chunk time,
+# stored as JSON on Document.chunk_index, used to check the model's
+# source_spans[{claim, chunk_ids}] and to search a document offline.
+import math, re
+from collections import Counter
+from typing import Dict, Any, List, Optional
+
+K1 = 1.5
+B = 0.75
+MIN_COVERAGE = 0.5   # share of a claim's (idf-weighted) terms its cited chunks must contain
+
+TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)   # letters/digits in any script
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in',
+    'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'were', 'with',
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def build_index(chunks: List[str]) -> Dict[str, Any]:
+    """
+    {'n': N, 'avgdl': float, 'lengths': [len per chunk], 'postings': {term: [[chunk_id, tf], ...]}}
+    Chunk ids are 1-based, matching the "Chunk i" ids in the LLM prompt.
+    """
+    postings: Dict[str, List[List[int]]] = {}
+    lengths = []
+    for cid, chunk in enumerate(chunks, 1):
+        tf = Counter(tokenize(chunk))
+        lengths.append(sum(tf.values()))
+        for term, n in tf.items():
+            postings.setdefault(term, []).append([cid, n])
+    n = len(chunks)
+    return {
+        "n": n,
+        "avgdl": (sum(lengths) / n) if n else 0.0,
+        "lengths": lengths,
+        "postings": postings,
+    }
+
+
+def _idf(index: Dict[str, Any], term: str) -> float:
+    df = len(index["postings"].get(term, ()))
+    return math.log(1 + (index["n"] - df + 0.5) / (df + 0.5))
+
+
+def _bm25(index: Dict[str, Any], terms: List[str], only: Optional[set] = None) -> Dict[int, float]:
+    scores: Dict[int, float] = {}
+    avgdl = index["avgdl"] or 1.0
+    lengths = index["lengths"]
+    for term in set(terms):
+        plist = index["postings"].get(term)
+        if not plist:
+            continue
+        idf = _idf(index, term)
+        for cid, tf in plist:
+            if only is not None and cid not in only:
+                continue
+            norm = tf + K1 * (1 - B + B * lengths[cid - 1] / avgdl)
+            scores[cid] = scores.get(cid, 0.0) + idf * tf * (K1 + 1) / norm
+    return scores
+
+
+def search(index: Dict[str, Any], query: str, k: int = 5) -> List[Dict[str, Any]]:
+    """Top-k chunks for a free-text query: [{'chunk_id': int, 'score': float}, ...]."""
+    if not index or not index.get("n"):
+        return []
+    scores = _bm25(index, tokenize(query))
+    best = sorted(scores.items(), key=lambda x: (-x[1], x[0]))[:max(1, k)]
+    return [{"chunk_id": cid, "score": round(score, 4)} for cid, score in best]
+
+
+def verify_source_spans(index: Dict[str, Any], spans: List[Any]) -> List[Any]:
+    """
+    Returns spans with 'supported' (bool) and 'support' (0..1 idf-weighted share of
+    the claim's terms found in the cited chunks) added. Unsupported spans also get
+    'suggested_chunk_ids' from a BM25 search over the whole document; cited ids
+    outside 1..N are listed in 'invalid_chunk_ids'.
+    """
+    if not index or not index.get("n"):
+        return spans
+    out = []
+    for span in spans:
+        if not isinstance(span, dict):
+            out.append(span)
+            continue
+        span = dict(span)
+        cited = {c for c in span.get("chunk_ids") or [] if isinstance(c, int)}
+        invalid = sorted(c for c in cited if not 1 <= c <= index["n"])
+        cited -= set(invalid)
+        terms = set(tokenize(span.get("claim", "")))
+
+        weight = sum(_idf(index, t) for t in terms)
+        found = 0.0
+        for t in terms:
+            if any(cid in cited for cid, _ in index["postings"].get(t, ())):
+                found += _idf(index, t)
+        support = (found / weight) if weight else 0.0
+
+        span["support"] = round(support, 3)
+        span["supported"] = bool(cited) and support >= MIN_COVERAGE
+        if invalid:
+            span["invalid_chunk_ids"] = invalid
+        if not span["supported"]:
+            span["suggested_chunk_ids"] = [h["chunk_id"] for h in search(index, span.get("claim", ""), k=3)]
+        out.append(span)
+    return out
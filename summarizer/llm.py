@@ -3,7 +3,7 @@ import json
 from typing import Dict, Any, List, Optional
 from django.conf import settings
 from jsonschema import validate
-from huggingface_hub import InferenceClient
+from .singleflight import llm_flight, prompt_key
 
 # --- Output contract schema ---
 CONTRACT_SCHEMA = {
@@ -58,14 +58,40 @@ def _extract_json(s: str) -> Optional[Dict[str, Any]]:
         pass
     return None
 
+def _generate(prompt: str) -> Dict[str, Any]:
+    # Imported here: huggingface_hub is slow to import and only needed by the pipeline
+    from huggingface_hub import InferenceClient
+    client = InferenceClient(token=settings.HF_API_KEY)
+
+    try:
+        # Use text generation; Qwen understands ChatML prompt above
+        text = client.text_generation(
+            prompt=prompt,
+            model=settings.HF_MODEL_ID,             # ensure we target Qwen
+            max_new_tokens=settings.HF_MAX_NEW_TOKENS,
+            temperature=0.2,
+            top_p=0.9,
+            do_sample=True,                         # set False if you prefer more determinism
+            return_full_text=False,
+            # Some backends honor seed; harmless if ignored
+            seed=getattr(settings, "OPENAI_SEED", 42),
+        )
+    except Exception as e:
+        return _fallback(f"Hugging Face API error: {e}", "hf_api_error")
+
+    obj = _extract_json(text or "")
+    if obj is not None:
+        return obj
+
+    # Last resort: return raw as summary
+    return _fallback(text or "Empty model response", "json_parse_error")
+
 def summarize(metadata: Dict[str,Any], chunks: List[str]) -> Dict[str,Any]:
     if not chunks or not any(c.strip() for c in chunks):
         return _fallback("OCR produced no readable text; nothing to summarize.", "empty_ocr")
     if not settings.HF_API_KEY:
         return _fallback("Missing HF_API_KEY. Set it in .env", "missing_api_key")
 
-    client = InferenceClient(token=settings.HF_API_KEY)
-
     system_prompt = (
         "You are a clinical scribe. Summarize only from the provided document chunks. "
         "Do not invent facts. Redact PHI where possible. Respond with ONLY valid JSON matching the schema."
@@ -86,25 +112,8 @@ def summarize(metadata: Dict[str,Any], chunks: List[str]) -> Dict[str,Any]:
 
     prompt = _chatml_qwen(system_prompt, user_msgs)
 
-    try:
-        # Use text generation; Qwen understands ChatML prompt above
-        text = client.text_generation(
-            prompt=prompt,
-            model=settings.HF_MODEL_ID,             # ensure we target Qwen
-            max_new_tokens=settings.HF_MAX_NEW_TOKENS,
-            temperature=0.2,
-            top_p=0.9,
-            do_sample=True,                         # set False if you prefer more determinism
-            return_full_text=False,
-            # Some backends honor seed; harmless if ignored
-            seed=getattr(settings, "OPENAI_SEED", 42),
-        )
-    except Exception as e:
-        return _fallback(f"Hugging Face API error: {e}", "hf_api_error")
-
-    obj = _extract_json(text or "")
-    if obj is not None:
-        return obj
-
-    # Last resort: return raw as summary
-    return _fallback(text or "Empty model response", "json_parse_error")
+    # Identical prompts in flight share one call; successful results are cached (TTL)
+    key = prompt_key(prompt, provider="hf-chatml", model=settings.HF_MODEL_ID,
+                     max_new_tokens=settings.HF_MAX_NEW_TOKENS, temperature=0.2, top_p=0.9,
+                     seed=getattr(settings, "OPENAI_SEED", 42))
+    return llm_flight().do(key, lambda: _generate(prompt), cacheable=lambda r: not r.get("error"))
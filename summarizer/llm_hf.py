@@ -3,7 +3,7 @@ import json
 from typing import Dict, Any, List, Optional
 from django.conf import settings
 from jsonschema import validate
-from huggingface_hub import InferenceClient
+from .singleflight import llm_flight, prompt_key
 
 CONTRACT_SCHEMA = {
     "type": "object",
@@ -77,10 +77,21 @@ def summarize(metadata: Dict[str,Any], chunks: List[str]) -> Dict[str,Any]:
     if not settings.HF_API_KEY:
         return _fallback("Missing HF_API_KEY. Set it in .env", "missing_api_key")
 
+    prompt = _build_prompt(metadata, chunks)
+
+    # Identical prompts in flight share one call; successful results are cached (TTL)
+    key = prompt_key(prompt, provider="hf", model=settings.HF_MODEL_ID,
+                     max_new_tokens=settings.HF_MAX_NEW_TOKENS, temperature=0.2, top_p=0.9,
+                     seed=getattr(settings, "OPENAI_SEED", 42))
+    return llm_flight().do(key, lambda: _generate(metadata, chunks, prompt),
+                           cacheable=lambda r: not r.get("error"))
+
+def _generate(metadata: Dict[str, Any], chunks: List[str], prompt: str) -> Dict[str, Any]:
+    # Imported here: huggingface_hub is slow to import and only needed by the pipeline
+    from huggingface_hub import InferenceClient
     client = InferenceClient(model=settings.HF_MODEL_ID, token=settings.HF_API_KEY)
 
     # 1) Try text-generation first (works for most instruct models)
-    prompt = _build_prompt(metadata, chunks)
     try:
         text = client.text_generation(
             prompt,
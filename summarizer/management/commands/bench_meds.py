@@ -0,0 +1,76 @@
+# summarizer/management/commands/bench_meds.py
+import random, statistics, time, tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...meds import MedIndex
+
+
+def _ocr_noise(rng: random.Random, s: str) -> str:
+    """One OCR/typing-style error: substitution, deletion or a confusable swap."""
+    if len(s) < 4:
+        return s
+    i = rng.randrange(1, len(s) - 1)
+    op = rng.choice(["sub", "del", "confuse"])
+    if op == "sub":
+        return s[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + s[i + 1:]
+    if op == "del":
+        return s[:i] + s[i + 1:]
+    confusable = {"o": "0", "l": "1", "i": "l", "e": "c", "m": "rn", "s": "5"}
+    return "".join(confusable.get(c, c) if j == i else c for j, c in enumerate(s))
+
+
+class Command(BaseCommand):
+    help = ("Benchmark medication-name normalization: index build time and memory, "
+            "lookup latency and throughput (cold vs LRU-cached) on brand names and "
+            "noisy spellings generated from the vocabulary.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--vocab", default=None, help="Vocabulary TSV (default: settings.MED_VOCAB_PATH).")
+        parser.add_argument("--lookups", type=int, default=20000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        path = opts["vocab"] or settings.MED_VOCAB_PATH
+
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        index = MedIndex.from_file(path)
+        build_ms = (time.perf_counter() - t0) * 1000
+        index_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        rng = random.Random(opts["seed"])
+        pairs = [(key, index.canonical[index.key_canon[kid]]) for kid, key in enumerate(index.keys)]
+        workload = []
+        for _ in range(opts["lookups"]):
+            key, canon = rng.choice(pairs)
+            q = _ocr_noise(rng, key) if rng.random() < 0.5 else key
+            workload.append((q.title() if rng.random() < 0.5 else q, canon))
+
+        latencies, correct, wrong = [], 0, 0
+        for q, canon in workload:
+            t = time.perf_counter()
+            hit = index._lookup(q)        # uncached path
+            latencies.append((time.perf_counter() - t) * 1e6)
+            correct += bool(hit and hit["canonical"] == canon)
+            wrong += bool(hit and hit["canonical"] != canon)
+
+        for q, _ in workload:            # fill the cache, then time warm lookups
+            index.lookup(q)
+        t = time.perf_counter()
+        for q, _ in workload:
+            index.lookup(q)
+        cached_s = time.perf_counter() - t
+
+        latencies.sort()
+        n = len(latencies)
+        self.stdout.write(f"vocabulary: {len(index.canonical)} drugs, {len(index.keys)} aliases, "
+                          f"{len(index.grams)} trigrams")
+        self.stdout.write(f"index build: {build_ms:.1f} ms, {index_bytes / 1024:.1f} KiB")
+        self.stdout.write(f"lookup (uncached): p50 {latencies[n // 2]:.1f} us, p99 {latencies[int(n * 0.99)]:.1f} us, "
+                          f"mean {statistics.fmean(latencies):.1f} us -> {1e6 / statistics.fmean(latencies):,.0f} lookups/s")
+        self.stdout.write(f"lookup (LRU-cached): {n / cached_s:,.0f} lookups/s")
+        self.stdout.write(f"accuracy on workload (50% noisy): {100.0 * correct / n:.1f}% correct, "
+                          f"{100.0 * wrong / n:.2f}% wrong drug, rest unmatched")
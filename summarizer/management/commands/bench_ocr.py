@@ -0,0 +1,118 @@
+# summarizer/management/commands/bench_ocr.py
+import os, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils import is_pdf, is_image
+
+
+def _corpus(paths: List[str]) -> List[str]:
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            for root, _, names in os.walk(p):
+                files.extend(os.path.join(root, n) for n in sorted(names))
+        else:
+            files.append(p)
+    return [f for f in files if is_pdf(f) or is_image(f)]
+
+
+class Command(BaseCommand):
+    help = ("Run OCR over a corpus of PDFs/images and compare latency: with and without "
+            "page preprocessing (--compare preprocess, reports pixels saved) or single "
+            "300-DPI pass vs two-tier low-confidence re-OCR (--compare two-tier, reports "
+            "the fraction of lines re-processed and of high-res pixels rendered) or per-page recognition vs batched "
+            "recognition across pages and concurrent documents (--compare batching).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Files or directories.")
+        parser.add_argument("--lang", default="multi", choices=["en", "multi"])
+        parser.add_argument("--doc-type", default="default", choices=["default", "labs"])
+        parser.add_argument("--repeat", type=int, default=1)
+        parser.add_argument("--compare", default="preprocess", choices=["preprocess", "two-tier", "batching"])
+        parser.add_argument("--workers", type=int, default=4,
+                            help="Documents OCR'd concurrently in --compare batching (background-worker case).")
+
+    def _run(self, files: List[str], ocr, opts, workers: int = 1, **kwargs) -> Dict[str, Any]:
+        from ...ocr import ocr_file
+        stats = {"ms": 0.0, "pages": 0, "pixels_in": 0, "pixels_out": 0, "cls_skipped": 0,
+                 "lines": 0, "reprocessed": 0, "render_frac": 0.0}
+        run = lambda path: ocr_file(path, opts["lang"], opts["doc_type"], ocr=ocr, **kwargs)
+        results = []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for _ in range(opts["repeat"]):
+                t0 = time.perf_counter()
+                results = list(pool.map(run, files))
+                stats["ms"] += (time.perf_counter() - t0) * 1000 / opts["repeat"]
+        for res in results:
+            for p in res["pages"]:
+                stats["pages"] += 1
+                prep = p.get("preprocess")
+                if prep:
+                    w, h = prep["orig_size"]
+                    stats["pixels_in"] += w * h
+                    stats["pixels_out"] += w * h - prep["pixels_saved"]
+                    stats["cls_skipped"] += 0 if prep.get("angle_cls", True) else 1
+                reocr = p.get("reocr")
+                if reocr:
+                    stats["lines"] += reocr["lines"]
+                    stats["reprocessed"] += reocr["reprocessed"]
+                    stats["render_frac"] += reocr["render_frac"]
+        return stats
+
+    def _report(self, label: str, stats: Dict[str, Any]):
+        self.stdout.write(f"{label:<14}{stats['ms']:10.1f} ms  ({stats['ms'] / max(1, stats['pages']):.1f} ms/page)")
+
+    def handle(self, *args, **opts):
+        from ...ocr import get_ocr_engine, ocr_file
+        files = _corpus(opts["paths"])
+        if not files:
+            raise CommandError("No PDF/image files found.")
+
+        ocr = get_ocr_engine(opts["lang"])
+        # Warm-up so model initialisation isn't billed to the first mode
+        ocr_file(files[0], opts["lang"], opts["doc_type"], ocr=ocr, preprocess=False, two_tier=False)
+
+        if opts["compare"] == "batching":
+            from ...ocr import get_batcher
+            per_page = self._run(files, ocr, opts, batched=False)
+            before = dict(get_batcher(ocr).stats)
+            batched = self._run(files, ocr, opts, workers=opts["workers"], batched=True)
+            after = get_batcher(ocr).stats
+            batches = after["batches"] - before["batches"]
+            crops = after["crops"] - before["crops"]
+            self.stdout.write(f"{len(files)} files, {per_page['pages']} pages")
+            self._report("per-page:", per_page)
+            self._report(f"batched x{opts['workers']}:", batched)
+            self.stdout.write(f"throughput: {1000.0 * per_page['pages'] / max(per_page['ms'], 1e-9):.2f} -> "
+                              f"{1000.0 * batched['pages'] / max(batched['ms'], 1e-9):.2f} pages/s "
+                              f"({per_page['ms'] / max(batched['ms'], 1e-9):.2f}x)")
+            self.stdout.write(f"recognition batches: {batches}, mean size {crops / max(1, batches):.1f} crops")
+            return
+
+        if opts["compare"] == "two-tier":
+            base = self._run(files, ocr, opts, two_tier=False)
+            fast = self._run(files, ocr, opts, two_tier=True)
+            self.stdout.write(f"{len(files)} files, {base['pages']} pages")
+            self._report("single pass:", base)
+            self._report("two-tier:", fast)
+            self.stdout.write(f"speedup: {base['ms'] / max(fast['ms'], 1e-9):.2f}x")
+            self.stdout.write(f"lines re-processed: {fast['reprocessed']}/{fast['lines']} "
+                              f"({100.0 * fast['reprocessed'] / max(1, fast['lines']):.1f}%)")
+            self.stdout.write(f"high-res pixels rendered: {100.0 * fast['render_frac'] / max(1, fast['pages']):.1f}% "
+                              f"of full-page renders")
+            return
+
+        raw = self._run(files, ocr, opts, preprocess=False, two_tier=False)
+        prep = self._run(files, ocr, opts, preprocess=True, two_tier=False)
+
+        saved = prep["pixels_in"] - prep["pixels_out"]
+        self.stdout.write(f"{len(files)} files, {raw['pages']} pages")
+        self._report("raw:", raw)
+        self._report("preprocessed:", prep)
+        self.stdout.write(f"latency change: {100.0 * (prep['ms'] - raw['ms']) / max(raw['ms'], 1e-9):+.1f}%")
+        self.stdout.write(f"pixels saved: {saved} of {prep['pixels_in']} "
+                          f"({100.0 * saved / max(1, prep['pixels_in']):.1f}%)")
+        self.stdout.write(f"pages skipping per-line angle classifier: {prep['cls_skipped']}/{prep['pages']}")
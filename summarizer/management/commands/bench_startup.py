@@ -0,0 +1,101 @@
+# summarizer/management/commands/bench_startup.py
+import os, re, subprocess, sys, time
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Modules that must never be imported by a web worker or a plain manage.py command.
+# They belong to the OCR / LLM pipeline and are imported lazily inside views.home().
+HEAVY_MODULES = [
+    "paddleocr", "paddle", "numpy", "cv2", "PIL", "pdf2image", "pypdf",
+    "huggingface_hub", "openai",
+]
+
+# What a gunicorn/uvicorn worker imports before serving its first request
+_WORKER_SNIPPET = (
+    "import importlib, {mod}; "
+    "from django.conf import settings; "
+    "importlib.import_module(settings.ROOT_URLCONF)"
+)
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def _parse_importtime(stderr: str) -> Tuple[int, Dict[str, int], Dict[str, int]]:
+    """Returns (total self time in us, {module: cumulative us}, {top-level import: cumulative us})."""
+    total = 0
+    cumulative, top_level = {}, {}
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        self_us, cum_us, indent, name = m.groups()
+        total += int(self_us)
+        cumulative[name] = int(cum_us)
+        if len(indent) == 1:
+            top_level[name] = int(cum_us)
+    return total, cumulative, top_level
+
+
+class Command(BaseCommand):
+    help = ("Measure cold-start import time of web workers and manage.py commands "
+            "with `python -X importtime` and fail if heavy OCR/LLM modules leak in "
+            "or the import budget is exceeded.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=3,
+                            help="Runs per target; the fastest run is reported.")
+        parser.add_argument("--budget-ms", type=float,
+                            default=float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1500")),
+                            help="Fail if any target's total import time exceeds this.")
+        parser.add_argument("--top", type=int, default=5,
+                            help="Show the N slowest modules (cumulative) per target.")
+
+    def _targets(self) -> List[Tuple[str, List[str]]]:
+        manage_py = str(settings.BASE_DIR / "manage.py")
+        return [
+            ("wsgi worker", ["-c", _WORKER_SNIPPET.format(mod="medvault.wsgi")]),
+            ("asgi worker", ["-c", _WORKER_SNIPPET.format(mod="medvault.asgi")]),
+            ("manage.py check", [manage_py, "check"]),
+            ("manage.py migrate --plan", [manage_py, "migrate", "--plan"]),
+        ]
+
+    def _run(self, argv: List[str]) -> Tuple[float, int, Dict[str, int], Dict[str, int]]:
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "medvault.settings")}
+        t0 = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", *argv],
+            cwd=str(settings.BASE_DIR), env=env, capture_output=True, text=True,
+        )
+        wall_ms = (time.perf_counter() - t0) * 1000
+        if proc.returncode != 0:
+            raise CommandError(f"{' '.join(argv)} exited with {proc.returncode}:\n{proc.stderr[-2000:]}")
+        return (wall_ms, *_parse_importtime(proc.stderr))
+
+    def handle(self, *args, **opts):
+        failures = []
+        for label, argv in self._targets():
+            best = None
+            for _ in range(max(1, opts["repeat"])):
+                run = self._run(argv)
+                if best is None or run[1] < best[1]:
+                    best = run
+            wall_ms, total_us, cumulative, top_level = best
+            import_ms = total_us / 1000
+
+            self.stdout.write(f"{label}: imports {import_ms:.1f} ms, wall {wall_ms:.1f} ms, "
+                              f"{len(cumulative)} modules")
+            slowest = sorted(top_level.items(), key=lambda x: x[1], reverse=True)[:opts["top"]]
+            for name, us in slowest:
+                self.stdout.write(f"    {us / 1000:8.1f} ms  {name}")
+
+            leaked = [m for m in HEAVY_MODULES if m in cumulative]
+            if leaked:
+                failures.append(f"{label}: imports heavy modules {', '.join(leaked)}")
+            if import_ms > opts["budget_ms"]:
+                failures.append(f"{label}: {import_ms:.1f} ms exceeds budget of {opts['budget_ms']:.0f} ms")
+
+        if failures:
+            raise CommandError("Startup regression:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("Startup imports within budget."))
@@ -0,0 +1,318 @@
+# summarizer/meds.py
+# Post-summarization medication normalization: map the model's free-text
+# meds[{name, dose, freq}] onto a canonical vocabulary (brand names, misspellings,
+# OCR variants) and parse dose/frequency into structured units.
+import logging, re, threading
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Words that describe the form/route rather than the drug
+FORM_WORDS = {
+    'tab', 'tabs', 'tablet', 'tablets', 'cap', 'caps', 'capsule', 'capsules', 'inj', 'injection',
+    'syp', 'syrup', 'susp', 'suspension', 'oral', 'iv', 'im', 'sc', 'po', 'sr', 'er', 'xr', 'cr',
+    'od', 'drops', 'cream', 'ointment', 'gel', 'inhaler', 'mg', 'mcg', 'g', 'ml',
+}
+MIN_DICE = 0.35          # trigram overlap needed to consider a candidate
+MAX_CANDIDATES = 8       # candidates verified with edit distance
+SHORT_TOKEN_LEN = 3      # tokens this short ("d3", "b12", "c", "xl") must match exactly
+# OCR confusions folded away before edit distance, so "arnlodipine"/"paracetamo1" cost nothing
+OCR_FOLD = [("rn", "m"), ("vv", "w"), ("0", "o"), ("1", "l"), ("5", "s")]
+
+
+def normalize_key(name: str) -> str:
+    s = re.sub(r"[^a-z0-9]+", " ", (name or "").lower())
+    words = [w for w in s.split() if w not in FORM_WORDS and not w[0].isdigit()]
+    return " ".join(words)
+
+
+def _grams(s: str) -> List[str]:
+    s = f"  {s} "
+    return [s[i:i + 3] for i in range(len(s) - 2)]
+
+
+def _max_edits(n: int) -> int:
+    """Edits tolerated in a fuzzy match of an n-character key."""
+    return 0 if n < 5 else 1 if n < 12 else 2
+
+
+def _fold(s: str) -> str:
+    for a, b in OCR_FOLD:
+        s = s.replace(a, b)
+    return s
+
+
+def _short_tokens(key: str) -> List[str]:
+    return sorted(t for t in key.split() if len(t) <= SHORT_TOKEN_LEN)
+
+
+def _edit_distance(a: str, b: str, max_d: int) -> int:
+    """Levenshtein distance, giving up (returning max_d + 1) once it must exceed max_d."""
+    if abs(len(a) - len(b)) > max_d:
+        return max_d + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+        if min(cur) > max_d:
+            return max_d + 1
+        prev = cur
+    return prev[-1]
+
+
+class MedIndex:
+    """
+    In-memory lookup index over a medication vocabulary:
+    exact map of normalized aliases + trigram inverted index for fuzzy candidates,
+    verified with bounded edit distance. lookup() results are LRU-cached.
+
+    Fuzzy matches are deliberately strict, since a wrong canonical name is worse
+    than none: at most _max_edits(len) edits, short tokens must agree exactly,
+    and a runner-up for a different drug within one edit of the best makes the
+    match ambiguous (no result).
+    """
+
+    def __init__(self, entries: List[Tuple[str, List[str]]], cache_size: int = 8192):
+        self.canonical: List[str] = []
+        self.keys: List[str] = []          # normalized alias strings
+        self.key_canon: List[int] = []     # alias -> canonical id
+        self.exact: Dict[str, int] = {}    # alias -> alias id
+        self.grams: Dict[str, List[int]] = {}
+        self.key_ngrams: List[int] = []    # distinct trigrams per alias (Dice denominator)
+        self.folded: List[str] = []        # alias with OCR_FOLD applied
+        for canon, aliases in entries:
+            cid = len(self.canonical)
+            self.canonical.append(canon)
+            for alias in [canon, *aliases]:
+                key = normalize_key(alias)
+                if not key or key in self.exact:
+                    continue
+                kid = len(self.keys)
+                self.keys.append(key)
+                self.key_canon.append(cid)
+                self.exact[key] = kid
+                grams = set(_grams(key))
+                self.key_ngrams.append(len(grams))
+                self.folded.append(_fold(key))
+                for g in grams:
+                    self.grams.setdefault(g, []).append(kid)
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    @classmethod
+    def from_file(cls, path: str) -> "MedIndex":
+        """TSV: canonical<TAB>alias|alias|...; '#' lines are comments."""
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                canon, _, aliases = line.partition("\t")
+                entries.append((canon.strip(), [a.strip() for a in aliases.split("|") if a.strip()]))
+        return cls(entries)
+
+    def _match(self, key: str) -> Optional[Tuple[int, float, str]]:
+        kid = self.exact.get(key)
+        if kid is not None:
+            return kid, 1.0, "exact"
+        grams = set(_grams(key))
+        counts = Counter()
+        for g in grams:
+            counts.update(self.grams.get(g, ()))
+        if not counts:
+            return None
+        n = len(grams)
+        scored = []
+        for kid, shared in counts.items():
+            dice = 2.0 * shared / (n + self.key_ngrams[kid])
+            if dice >= MIN_DICE:
+                scored.append((dice, kid))
+        scored.sort(reverse=True)
+        max_d = _max_edits(len(key))
+        folded, short = _fold(key), _short_tokens(key)
+        found = []
+        for dice, kid in scored[:MAX_CANDIDATES]:
+            if _short_tokens(self.keys[kid]) != short:
+                continue
+            d = _edit_distance(folded, self.folded[kid], max_d)
+            if d <= max_d:
+                found.append((d, kid))
+        if not found:
+            return None
+        found.sort()
+        d, kid = found[0]
+        for d2, kid2 in found[1:]:
+            if d2 <= d + 1 and self.key_canon[kid2] != self.key_canon[kid]:
+                return None
+        return kid, round(1.0 - d / max(len(key), len(self.keys[kid])), 3), "fuzzy"
+
+    def _lookup(self, name: str) -> Optional[Dict[str, Any]]:
+        key = normalize_key(name)
+        if not key:
+            return None
+        hit = self._match(key)
+        if hit is not None:
+            kid, score, method = hit
+            canon = self.canonical[self.key_canon[kid]]
+            return {"canonical": canon, "ingredients": [canon], "matched": self.keys[kid],
+                    "score": score, "method": method}
+        # "Glycomet GP 2" / "Metformin hydrochloride" / "Amlodipine + Telmisartan": match
+        # the individual words in input order and keep every ingredient found
+        words = key.split()
+        if len(words) < 2:
+            return None
+        found: Dict[str, Tuple[str, float, str]] = {}
+        for w in dict.fromkeys(words):
+            hit = self._match(w) if len(w) >= 4 else None
+            if hit is not None:
+                kid, score, method = hit
+                found.setdefault(self.canonical[self.key_canon[kid]], (self.keys[kid], score, method))
+        if not found:
+            return None
+        canons = sorted(found)
+        return {"canonical": " + ".join(canons), "ingredients": canons,
+                "matched": " + ".join(found[c][0] for c in canons),
+                "score": min(found[c][1] for c in canons),
+                "method": found[canons[0]][2] if len(canons) == 1 else "combination"}
+
+
+_INDEX: Optional[MedIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_med_index() -> MedIndex:
+    """Process-wide index loaded once from settings.MED_VOCAB_PATH (empty if missing)."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            path = getattr(settings, "MED_VOCAB_PATH", "")
+            try:
+                _INDEX = MedIndex.from_file(path)
+            except OSError as e:
+                logger.warning("Medication vocabulary not loaded (%s); names left unnormalized", e)
+                _INDEX = MedIndex([])
+        return _INDEX
+
+
+# ---- dose / frequency ----
+
+# Never starts mid-number: "1,000 mg" is 1000, not "000 mg"
+DOSE_RE = re.compile(r"(?<![\d.,])(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)\s*"
+                     r"(mcg|µg|ug|mg|g|gm|ml|iu|units?|u|%)(?!\w)", re.I)
+# unit -> (canonical unit, factor)
+DOSE_UNITS = {
+    'mcg': ('mg', 0.001), 'µg': ('mg', 0.001), 'ug': ('mg', 0.001), 'mg': ('mg', 1.0),
+    'g': ('mg', 1000.0), 'gm': ('mg', 1000.0), 'ml': ('ml', 1.0),
+    'iu': ('units', 1.0), 'unit': ('units', 1.0), 'units': ('units', 1.0), 'u': ('units', 1.0),
+    '%': ('%', 1.0),
+}
+
+# (pattern, code, doses per day)
+FREQ_PATTERNS = [
+    (re.compile(r"\b(q\.?i\.?d|qds|four times)\b", re.I), "QID", 4.0),
+    (re.compile(r"\b(t\.?i\.?d|tds|thrice|three times)\b", re.I), "TID", 3.0),
+    (re.compile(r"\b(b\.?i\.?d|bd|twice)\b", re.I), "BID", 2.0),
+    (re.compile(r"\b(q\.?h\.?s|h\.?s|at night|bedtime|nightly)\b", re.I), "HS", 1.0),
+    (re.compile(r"\b(weekly|once a week|once weekly)\b", re.I), "WEEKLY", 1.0 / 7),
+    (re.compile(r"\b(o\.?d|q\.?d|once|daily|every day|per day|a day)\b", re.I), "QD", 1.0),
+]
+# "2 times a day", "3 times daily", "twice weekly", "once in 2 days", "1x/week"
+COUNT_PER_PERIOD_RE = re.compile(
+    r"\b(\d+|once|twice|thrice|one|two|three|four)\s*(?:times?|x)?\s*"
+    r"(?:(?:a|per|/|in|every)\s*(\d+\s*)?(day|week)s?|(daily|weekly))\b", re.I)
+COUNT_WORDS = {'once': 1, 'one': 1, 'twice': 2, 'two': 2, 'thrice': 3, 'three': 3, 'four': 4}
+DAILY_CODES = {1: "QD", 2: "BID", 3: "TID", 4: "QID"}
+EVERY_N_HOURS_RE = re.compile(r"\b(?:q|every)\s*(\d{1,2})\s*(?:h|hr|hrs|hours?)\b", re.I)
+# "1-0-1", "1/2-0-1/2", "½-0-½": tablets per slot (morning-noon-night[-bedtime])
+_GRID_SLOT = r"([0-2](?:\.5)?|1/2|½)"
+DOSING_GRID_RE = re.compile(r"(?<![\d/.])" + r"\s*-\s*".join([_GRID_SLOT] * 3)
+                            + r"(?:\s*-\s*" + _GRID_SLOT + r")?(?![\d/.])")
+GRID_HALVES = {'1/2': 0.5, '½': 0.5}
+PRN_RE = re.compile(r"\b(p\.?r\.?n|sos|as needed|when required|if needed)\b", re.I)
+
+
+def parse_dose(dose: str) -> Dict[str, Any]:
+    """'500 mg' -> {'dose_value': 500.0, 'dose_unit': 'mg'}; mass is normalized to mg."""
+    m = DOSE_RE.search(dose or "")
+    if not m:
+        return {"dose_value": None, "dose_unit": None}
+    unit, factor = DOSE_UNITS[m.group(2).lower()]
+    return {"dose_value": round(float(m.group(1).replace(",", "")) * factor, 6), "dose_unit": unit}
+
+
+def _count_per_period(m: re.Match) -> Optional[Tuple[str, float]]:
+    """(freq_code, doses per day) for one COUNT_PER_PERIOD_RE match; None for a zero count or period."""
+    count, n, unit, adverb = m.groups()
+    count = int(count) if count.isdigit() else COUNT_WORDS[count.lower()]
+    days = int(n or 1) * (7 if (unit or adverb).lower().startswith("week") else 1)
+    if not count or not days:
+        return None
+    if days == 1:
+        code = DAILY_CODES.get(count, f"{count}X/D")
+    elif count == 1:
+        code = "WEEKLY" if days == 7 else f"Q{days}D"
+    else:
+        weeks, rem = divmod(days, 7)
+        code = f"{count}X/" + (f"{days}D" if rem else "WK" if weeks == 1 else f"{weeks}WK")
+    return code, count / days
+
+
+def parse_freq(freq: str) -> Dict[str, Any]:
+    """
+    '1-0-1' / '2 times a day' / 'BID' / 'every 8 hours' -> {'freq_code', 'per_day', 'prn'}.
+    Counts per period are read before keywords; conflicting counts leave both fields None.
+    """
+    freq = freq or ""
+    out = {"freq_code": None, "per_day": None, "prn": bool(PRN_RE.search(freq))}
+    grid = DOSING_GRID_RE.search(freq)
+    if grid:
+        # Amounts stay in the code; per_day counts administrations like the other forms
+        slots = [GRID_HALVES.get(g) or float(g) for g in grid.groups() if g]
+        out["per_day"] = float(sum(1 for v in slots if v))
+        out["freq_code"] = "-".join(f"{v:g}" for v in slots)
+        return out
+    counts = list(COUNT_PER_PERIOD_RE.finditer(freq))
+    if counts:
+        parsed = {_count_per_period(m) for m in counts}
+        if len(parsed) == 1 and None not in parsed:
+            code, per_day = parsed.pop()
+            out["freq_code"], out["per_day"] = code, round(per_day, 3)
+        return out
+    every = EVERY_N_HOURS_RE.search(freq)
+    if every and int(every.group(1)) > 0:
+        out["per_day"] = round(24.0 / int(every.group(1)), 3)
+        out["freq_code"] = f"Q{int(every.group(1))}H"
+        return out
+    for pattern, code, per_day in FREQ_PATTERNS:
+        if pattern.search(freq):
+            out["freq_code"], out["per_day"] = code, round(per_day, 3)
+            break
+    return out
+
+
+def normalize_meds(meds: List[Any], index: Optional[MedIndex] = None) -> List[Dict[str, Any]]:
+    """One structured record per well-formed summary_json['meds'] entry, in the same order."""
+    index = index or get_med_index()
+    out = []
+    for m in meds:
+        if not isinstance(m, dict):
+            continue
+        name, dose, freq = m.get("name") or "", m.get("dose") or "", m.get("freq") or ""
+        hit = index.lookup(name) if name else None
+        rec = {
+            "name": name,
+            "canonical": hit["canonical"] if hit else None,
+            "ingredients": hit["ingredients"] if hit else [],
+            "match_score": hit["score"] if hit else 0.0,
+            "match_method": hit["method"] if hit else None,
+        }
+        # Doses are often folded into the name ("Metformin 500mg")
+        rec.update(parse_dose(dose or name))
+        rec.update(parse_freq(freq))
+        out.append(rec)
+    return out
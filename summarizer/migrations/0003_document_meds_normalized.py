@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('summarizer', '0002_document_chunks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='meds_normalized',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -27,6 +27,9 @@ class Document(models.Model):
     status = models.CharField(max_length=10, choices=STATUS, default='uploaded')
     ocr_text = models.TextField(blank=True)
     summary_json = models.JSONField(default=dict, blank=True)
+    chunks = models.JSONField(default=list, blank=True)
+    chunk_index = models.JSONField(default=dict, blank=True)  # evidence.build_index(chunks)
+    meds_normalized = models.JSONField(default=list, blank=True)  # meds.normalize_meds(summary_json['meds'])
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
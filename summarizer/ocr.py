@@ -1,86 +1,339 @@
 # summarizer/ocr.py
-import os
-from typing import Dict, Any
-from PIL import Image
-from .utils import is_pdf, is_image, pdf_to_images, image_from_file, extract_pdf_metadata
+import os, threading
+from functools import partial
+from typing import Dict, Any, List, Optional, Callable, TYPE_CHECKING
+from django.conf import settings
+from .utils import is_pdf, is_image, pdf_to_images, pdf_page_region, image_from_file, extract_pdf_metadata
 from .postprocess import language_aware_normalize
+from .preprocess import preprocess_page, line_bands, unmap_box, replay_photometric, crop_quad
+from .batching import RecognitionBatcher
 import numpy as np
 
+if TYPE_CHECKING:
+    from PIL import Image
 
+# PaddleOCR pulls in paddle, numpy, cv2 and friends (seconds of import time and
+# hundreds of MB of RSS). Only processes that actually run OCR should pay for
+# that, so everything heavy is resolved on first use by _load_paddle().
 _OCR_ERR = None
 _PPSTRUCTURE_ERR = None
+_PADDLE_LOADED = False
 
-# Base OCR (required)
-try:
-    from paddleocr import PaddleOCR
-except Exception as e:
-    _OCR_ERR = e
-    PaddleOCR = None
-
-# Table extraction (optional): prefer PPStructure; fall back to TableSystem
+PaddleOCR = None
 PPStructure = None
 TableSystem = None
-try:
-    # Newer & recommended API
-    from paddleocr import PPStructure as _PPStructure
-    PPStructure = _PPStructure
-except Exception as e1:
+
+# One engine per recognition language per process, shared by all requests so
+# that their line crops can be batched together (see get_batcher()).
+_ENGINES: Dict[str, Any] = {}
+_BATCHERS: Dict[int, RecognitionBatcher] = {}
+_ENGINES_LOCK = threading.Lock()
+
+# Two-tier re-OCR renders only the parts of a page around its low-confidence lines
+REOCR_MARGIN_FRAC = 0.25     # of a line's height, kept around it in the high-res render
+REOCR_MERGE_GAP_FRAC = 0.05  # of the page height: lines closer than this share one render
+REOCR_MAX_REGIONS = 3        # more separate regions than this are rendered as one
+
+
+def _load_paddle():
+    global _PADDLE_LOADED, _OCR_ERR, _PPSTRUCTURE_ERR, PaddleOCR, PPStructure, TableSystem
+    if _PADDLE_LOADED:
+        return
+    _PADDLE_LOADED = True
+
+    # Base OCR (required)
+    try:
+        from paddleocr import PaddleOCR as _PaddleOCR
+        PaddleOCR = _PaddleOCR
+    except Exception as e:
+        _OCR_ERR = e
+
+    # Table extraction (optional): prefer PPStructure; fall back to TableSystem
     try:
-        # Older API
-        from paddleocr.ppstructure.table.predict_table import TableSystem as _TableSystem
-        TableSystem = _TableSystem
-    except Exception as e2:
-        _PPSTRUCTURE_ERR = (e1, e2)
+        # Newer & recommended API
+        from paddleocr import PPStructure as _PPStructure
+        PPStructure = _PPStructure
+    except Exception as e1:
+        try:
+            # Older API
+            from paddleocr.ppstructure.table.predict_table import TableSystem as _TableSystem
+            TableSystem = _TableSystem
+        except Exception as e2:
+            _PPSTRUCTURE_ERR = (e1, e2)
 
 def get_ocr_engine(lang_mode: str = "multi"):
+    _load_paddle()
     if PaddleOCR is None:
         raise RuntimeError(f"PaddleOCR not available: {_OCR_ERR}")
     # 'en' for English only; 'ch' is multilingual model that also handles Latin scripts
     recog_lang = "en" if lang_mode == "en" else "ch"
-    return PaddleOCR(lang=recog_lang, use_angle_cls=True, show_log=False)
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(recog_lang)
+        if engine is None:
+            # drop_score=0: keep low-confidence lines so two-tier mode can re-recognize them;
+            # _finish_page applies OCR_DROP_SCORE itself afterwards.
+            engine = PaddleOCR(lang=recog_lang, use_angle_cls=True, show_log=False, drop_score=0.0)
+            _ENGINES[recog_lang] = engine
+    return engine
 
-def ocr_file(path: str, lang_mode: str = "multi", doc_type: str = "default") -> Dict[str, Any]:
+def _recognize_batch(ocr, crops: List[np.ndarray]) -> List[tuple]:
+    # Runs under the batcher's lock. The recognizer's inference batch is raised to
+    # the whole batch for this call only; per-page ocr() keeps the engine default.
+    rec = ocr.text_recognizer
+    default = rec.rec_batch_num
+    rec.rec_batch_num = max(default, len(crops))
+    try:
+        return rec(crops)[0]
+    finally:
+        rec.rec_batch_num = default
+
+def get_batcher(ocr) -> RecognitionBatcher:
+    """Process-wide recognition batcher for an engine; its .lock guards every call into the engine."""
+    with _ENGINES_LOCK:
+        batcher = _BATCHERS.get(id(ocr))
+        if batcher is None:
+            classify = None
+            if getattr(ocr, "text_classifier", None) is not None:
+                classify = lambda crops: ocr.text_classifier(crops)[0]
+            batcher = RecognitionBatcher(
+                recognize=partial(_recognize_batch, ocr),
+                classify=classify,
+                max_batch=getattr(settings, "OCR_REC_BATCH_SIZE", 64),
+                max_wait_ms=getattr(settings, "OCR_BATCH_WAIT_MS", 10),
+            )
+            _BATCHERS[id(ocr)] = batcher
+    return batcher
+
+def ocr_file(path: str, lang_mode: str = "multi", doc_type: str = "default",
+             ocr=None, preprocess: Optional[bool] = None, two_tier: Optional[bool] = None,
+             batched: Optional[bool] = None) -> Dict[str, Any]:
     """
     Returns:
     {
       'metadata': {...},
-      'pages': [ {'text': '...', 'tables': [html,...], 'page': N}, ... ]
+      'pages': [ {'text': '...', 'tables': [html,...], 'preprocess': {...} or None,
+                  'reocr': {'lines': N, 'reprocessed': M, 'render_frac': F} or None,
+                  'page': N}, ... ]
     }
+    `ocr` lets callers reuse an engine; `preprocess`, `two_tier` and `batched` override
+    settings.OCR_PREPROCESS, doc_type in settings.OCR_TWO_TIER_DOC_TYPES and
+    settings.OCR_BATCH_RECOGNITION.
+
+    Two-tier mode OCRs a fast OCR_FAST_DPI render and re-recognizes only the lines
+    whose confidence is below OCR_REOCR_CONF, from OCR_DPI renders of just the page
+    regions around them (render_frac: share of a full OCR_DPI page rendered).
+    Batched mode detects lines on every page first, then queues all pages' crops on
+    the shared RecognitionBatcher before collecting any result, so recognition runs in
+    large batches across pages (and across documents OCR'd concurrently).
     """
-    ocr = get_ocr_engine(lang_mode)
-    pages = []
+    if ocr is None:
+        ocr = get_ocr_engine(lang_mode)
+    if preprocess is None:
+        preprocess = getattr(settings, "OCR_PREPROCESS", True)
+    if two_tier is None:
+        two_tier = doc_type in getattr(settings, "OCR_TWO_TIER_DOC_TYPES", [])
+    if batched is None:
+        batched = getattr(settings, "OCR_BATCH_RECOGNITION", False)
+    dpi = getattr(settings, "OCR_DPI", 300)
+    fast_dpi = getattr(settings, "OCR_FAST_DPI", 150)
+    need_tables = doc_type == "labs"
+    jobs = []   # (page image, hi-res region renderer (x, y, w, h) -> image or None, hi-res scale)
     meta = {}
 
     if is_pdf(path):
-        images = pdf_to_images(path, dpi=300)
         meta = extract_pdf_metadata(path)
-        for idx, img in enumerate(images, 1):
-            p = _ocr_image(img, ocr, need_tables=(doc_type == "labs"), lang_mode=lang_mode)
-            p["page"] = idx
-            pages.append(p)
+        if two_tier:
+            for idx, img in enumerate(pdf_to_images(path, dpi=fast_dpi), 1):
+                jobs.append((img, partial(pdf_page_region, path, idx, dpi), dpi / fast_dpi))
+        else:
+            jobs = [(img, None, 1.0) for img in pdf_to_images(path, dpi=dpi)]
     elif is_image(path):
         img = image_from_file(path)
-        p = _ocr_image(img, ocr, need_tables=(doc_type == "labs"), lang_mode=lang_mode)
-        p["page"] = 1
-        pages.append(p)
+        scale = dpi / fast_dpi
+        # Photos/scans have no DPI to re-render at: the fast pass runs on a downscaled
+        # copy and the original is the high-resolution source (skip tiny images).
+        if two_tier and min(img.size) / scale >= 600:
+            small = img.resize((round(img.width / scale), round(img.height / scale)))
+            jobs.append((small, lambda x, y, w, h: img.crop((x, y, x + w, y + h)), img.width / small.width))
+        else:
+            jobs.append((img, None, 1.0))
     else:
         raise ValueError("Unsupported file type")
+
+    staged = [_start_page(img, ocr, need_tables, preprocess, batched) for img, _, _ in jobs]
+    # Queue every page only after all of them are detected, so the batcher sees the
+    # whole document at once instead of one page per detection-sized gap.
+    for page in staged:
+        if "crops" in page:
+            page["future"] = get_batcher(ocr).submit(page.pop("crops"), cls=page["use_cls"])
+    pages = []
+    for idx, (page, (_, hires, hires_scale)) in enumerate(zip(staged, jobs), 1):
+        p = _finish_page(page, ocr, need_tables, lang_mode, hires=hires, hires_scale=hires_scale)
+        p["page"] = idx
+        pages.append(p)
     return {"metadata": meta, "pages": pages}
 
-def _ocr_image(img: Image.Image, ocr, need_tables: bool, lang_mode: str) -> Dict[str, Any]:
-    # ----- Text OCR -----
-    # result = ocr.ocr(img, cls=True)
+def _recognize(ocr, crops: List[np.ndarray], cls: bool) -> List[tuple]:
+    """Angle-classifies (optionally) and recognizes a list of line crops -> [(text, conf), ...]."""
+    return get_batcher(ocr).recognize(crops, cls)
+
+def _sorted_boxes(boxes: List[Any]) -> List[Any]:
+    # Top-to-bottom, then left-to-right within a line (same rule as PaddleOCR's sorted_boxes)
+    boxes = sorted(boxes, key=lambda b: (b[0][1], b[0][0]))
+    for i in range(len(boxes) - 1):
+        for j in range(i, -1, -1):
+            if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+            else:
+                break
+    return boxes
+
+def _page_is_flipped(img_np: np.ndarray, ocr) -> Optional[bool]:
+    """
+    Runs PaddleOCR's angle classifier on a handful of line crops of a deskewed page.
+    True/False when the page is clearly upside down / upright, None when unsure.
+    """
+    classifier = getattr(ocr, "text_classifier", None)
+    if classifier is None:
+        return None
+    bands = line_bands(img_np)
+    if len(bands) < 3:
+        return None
+    crops = [img_np[y0:y1, x0:x1].copy() for x0, y0, x1, y1 in bands]
+    try:
+        with get_batcher(ocr).lock:
+            _, cls_res, _ = classifier(crops)
+    except Exception:
+        return None
+    votes = [label for label, score in cls_res if score >= 0.9]
+    if len(votes) < 0.66 * len(bands):
+        return None
+    flipped = sum(1 for v in votes if v == "180")
+    if flipped >= 0.8 * len(votes):
+        return True
+    if flipped <= 0.2 * len(votes):
+        return False
+    return None
+
+def _reocr_regions(rects: List[List[float]], gap: float) -> List[tuple]:
+    """Groups line rectangles into [(x0, y0, x1, y1), [line indexes]] render regions, top to bottom."""
+    regions = []
+    for i in sorted(range(len(rects)), key=lambda i: rects[i][1]):
+        x0, y0, x1, y1 = rects[i]
+        if regions and y0 <= regions[-1][0][3] + gap:
+            r, members = regions[-1]
+            regions[-1] = ([min(r[0], x0), r[1], max(r[2], x1), max(r[3], y1)], members + [i])
+        else:
+            regions.append(([x0, y0, x1, y1], [i]))
+    if len(regions) > REOCR_MAX_REGIONS:
+        rs = [r for r, _ in regions]
+        regions = [([min(r[0] for r in rs), rs[0][1], max(r[2] for r in rs), max(r[3] for r in rs)],
+                    list(range(len(rects))))]
+    return regions
+
+def _reocr_low_confidence(lines: List[Dict[str, Any]], ocr, use_cls: bool, prep: Optional[Dict[str, Any]],
+                          page_size: tuple, hires: Callable[..., "Image.Image"], hires_scale: float) -> tuple:
+    """
+    Re-recognizes lines below OCR_REOCR_CONF from high-resolution renders of the page
+    regions around them, in place. Returns (lines re-processed, share of a full
+    high-resolution page that was rendered).
+    """
+    threshold = getattr(settings, "OCR_REOCR_CONF", 0.85)
+    low = [l for l in lines if l["conf"] < threshold]
+    if not low:
+        return 0, 0.0
+    page_w, page_h = (int(round(v * hires_scale)) for v in page_size)
+    quads = [unmap_box(l["box"], prep, hires_scale) for l in low]
+    rects = []
+    for q in quads:
+        (x0, y0), (x1, y1) = q.min(axis=0), q.max(axis=0)
+        m = REOCR_MARGIN_FRAC * (y1 - y0) + 2
+        rects.append([x0 - m, y0 - m, x1 + m, y1 + m])
+    crops, rendered = [None] * len(low), 0
+    for (x0, y0, x1, y1), members in _reocr_regions(rects, REOCR_MERGE_GAP_FRAC * page_h):
+        x0, y0 = max(0, int(x0)), max(0, int(y0))
+        x1, y1 = min(page_w, int(np.ceil(x1))), min(page_h, int(np.ceil(y1)))
+        if x1 <= x0 or y1 <= y0:
+            continue
+        region = np.array(hires(x0, y0, x1 - x0, y1 - y0).convert("RGB"))
+        if prep is not None:
+            region = replay_photometric(region, prep)
+        rendered += region.shape[0] * region.shape[1]
+        for i in members:
+            crops[i] = crop_quad(region, quads[i] - np.float32([x0, y0]))
+    todo = [i for i, c in enumerate(crops) if c is not None]
+    for i, (txt, conf) in zip(todo, _recognize(ocr, [crops[i] for i in todo], use_cls)):
+        if txt and conf > low[i]["conf"]:
+            low[i]["text"], low[i]["conf"] = txt, float(conf)
+    return len(todo), rendered / float(max(1, page_w * page_h))
+
+def _start_page(img: "Image.Image", ocr, need_tables: bool, preprocess: bool, batched: bool) -> Dict[str, Any]:
+    """Preprocesses and detects one page; in batched mode its line crops are left for ocr_file to queue."""
     img_np = np.array(img.convert("RGB"))   # HxWx3 uint8
-    result = ocr.ocr(img_np, cls=True)
+    lock = get_batcher(ocr).lock
+
+    # ----- Preprocessing (crop / deskew / binarize), once per page -----
+    prep = None
+    angle_cls = getattr(settings, "OCR_ANGLE_CLS", "auto")
+    use_cls = angle_cls != "never"
+    if preprocess:
+        img_np, prep = preprocess_page(
+            img_np,
+            binarize=getattr(settings, "OCR_BINARIZE", False),
+            denoise=getattr(settings, "OCR_DENOISE", False),
+        )
+        # Upright, deskewed page: settle 0/180 once instead of classifying every line
+        if angle_cls == "auto" and prep["upright"]:
+            flipped = _page_is_flipped(img_np, ocr)
+            if flipped is not None:
+                if flipped:
+                    img_np = np.ascontiguousarray(img_np[::-1, ::-1])
+                prep["flipped"] = flipped
+                use_cls = False
+        prep["angle_cls"] = use_cls
+
+    page = {"prep": prep, "use_cls": use_cls, "size": img.size, "img_np": img_np if need_tables else None}
+
+    # ----- Text OCR -----
+    if batched:
+        # Detector called directly: PaddleOCR.ocr(det=True, rec=False) truth-tests the
+        # box ndarray and raises on any page with text.
+        with lock:
+            dt_boxes, _ = ocr.text_detector(img_np)
+        boxes = _sorted_boxes([b.tolist() for b in dt_boxes]) if dt_boxes is not None else []
+        page["boxes"] = boxes
+        page["crops"] = [crop_quad(img_np, np.asarray(b, dtype=np.float32)) for b in boxes]
+    else:
+        with lock:
+            result = ocr.ocr(img_np, cls=use_cls)
+        lines = []
+        # result: list per image; each item is list of [box, (text, conf)]
+        for r in result:
+            for b in r or []:   # PaddleOCR yields None for pages without text
+                txt, conf = b[1]
+                if txt:
+                    lines.append({"box": b[0], "text": txt, "conf": float(conf)})
+        page["lines"] = lines
+    return page
+
+def _finish_page(page: Dict[str, Any], ocr, need_tables: bool, lang_mode: str,
+                 hires: Optional[Callable[..., "Image.Image"]] = None, hires_scale: float = 1.0) -> Dict[str, Any]:
+    lines = page.get("lines")
+    if lines is None:
+        # Scatter batched recognition results back onto this page's boxes, in order
+        lines = [{"box": b, "text": txt, "conf": float(conf)}
+                 for b, (txt, conf) in zip(page["boxes"], page["future"].result()) if txt]
+    prep, use_cls = page["prep"], page["use_cls"]
+
+    # ----- Two-tier: re-recognize only low-confidence lines at high resolution -----
+    reocr = None
+    if hires is not None:
+        n, frac = _reocr_low_confidence(lines, ocr, use_cls, prep, page["size"], hires, hires_scale)
+        reocr = {"lines": len(lines), "reprocessed": n, "render_frac": round(frac, 4)}
 
-    lines = []
-    # result: list per image; each item is list of [box, (text, conf)]
-    for r in result:
-        for b in r:
-            txt, conf = b[1]
-            if txt:
-                lines.append(txt)
-    text = language_aware_normalize("\n".join(lines), lang_mode)
+    drop_score = getattr(settings, "OCR_DROP_SCORE", 0.5)
+    text = language_aware_normalize("\n".join(l["text"] for l in lines if l["conf"] >= drop_score), lang_mode)
+    img_np = page["img_np"]
 
     # ----- Table extraction (optional) -----
     tables = []
@@ -125,4 +378,4 @@ def _ocr_image(img: Image.Image, ocr, need_tables: bool, lang_mode: str) -> Dict
             # Any table error shouldn't block OCR; just skip tables
             pass
 
-    return {"text": text, "tables": tables}
+    return {"text": text, "tables": tables, "preprocess": prep, "reocr": reocr}
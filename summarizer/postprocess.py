@@ -1,8 +1,8 @@
 import re, unicodedata
-from langdetect import detect, DetectorFactory
-from ftfy import fix_text
 
-DetectorFactory.seed = 0
+# ftfy and langdetect are only needed once OCR text exists; import them on first use
+# so that web workers importing redact_phi() start fast.
+_LANGDETECT_SEEDED = False
 
 ZERO_WIDTH = [
     '\u200B','\u200C','\u200D','\u2060','\uFEFF'
@@ -16,6 +16,7 @@ DOB_RE = re.compile(r'\b(?:DOB|D\.O\.B\.|Date of Birth)[:\s]*\d{1,2}[-/ ]\d{1,2}
 MRN_RE = re.compile(r'\b(?:MRN|Patient\s?ID|UHID)[:\s]*[A-Za-z0-9-]+\b', re.I)
 
 def cleanup_unicode(text: str) -> str:
+    from ftfy import fix_text
     text = fix_text(text)
     text = unicodedata.normalize('NFKC', text)
     text = ZW_RE.sub('', text)
@@ -32,6 +33,11 @@ def redact_phi(text: str) -> str:
     return text
 
 def language_aware_normalize(text: str, lang_mode: str = 'multi') -> str:
+    global _LANGDETECT_SEEDED
+    from langdetect import detect, DetectorFactory
+    if not _LANGDETECT_SEEDED:
+        DetectorFactory.seed = 0
+        _LANGDETECT_SEEDED = True
     text = cleanup_unicode(text)
     try:
         lang = detect(text) if lang_mode == 'multi' else 'en'
@@ -0,0 +1,249 @@
+# summarizer/preprocess.py
+# Page preprocessing run once per page before OCR: crop to the content bounding
+# box, deskew, optionally denoise/binarize. All analysis is done with numpy on a
+# downscaled grayscale copy, then applied to the full-resolution page.
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+import cv2
+
+ANALYSIS_MAX_SIDE = 1200     # long side of the downscaled copy used for analysis
+CROP_MARGIN_FRAC = 0.01      # padding kept around the detected content box
+SPECK_MAX_AREA = 8           # ink components this small (analysis-scale px) are dust, not content
+GLYPH_MIN_FRAC = 0.005       # marks smaller than this (of the long side) only count in word-like clusters
+CLUSTER_MIN_PARTS = 3        # ... of at least this many marks
+EDGE_STRIP_FRAC = 0.02       # border-touching components thinner than this (of the long side) ...
+EDGE_STRIP_MIN_LEN = 0.25    # ... and longer than this (of the page side) are scanner edges
+MAX_SKEW_DEG = 15.0
+UPRIGHT_MIN_LINE_SCORE = 1.5 # profile sharpness (best/worst angle) needed to trust line structure
+
+
+def _to_gray(img: np.ndarray) -> np.ndarray:
+    if img.ndim == 2:
+        return img
+    return cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+
+
+def _ink_mask(gray: np.ndarray) -> np.ndarray:
+    # Dark-on-locally-light pixels. Adaptive thresholding keeps uniform photo
+    # backgrounds (desk, hand) out of the mask while text strokes stay in.
+    block = max(15, (min(gray.shape) // 40) | 1)
+    mask = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+                                 cv2.THRESH_BINARY_INV, block, 15)
+    return mask > 0
+
+
+def content_bbox(mask: np.ndarray) -> Tuple[int, int, int, int]:
+    """
+    (x0, y0, x1, y1) of the inked area of a boolean mask, padded by CROP_MARGIN_FRAC.
+    Scanner-edge strips (thin, long components reaching the page border) and
+    dust are ignored: a mark counts when it is at least glyph-sized, or when it
+    sits in a cluster of CLUSTER_MIN_PARTS marks like the letters of small
+    print. Sparse real content (a flag column, a page footer) stays in the box.
+    """
+    h, w = mask.shape
+    side = max(h, w)
+    _, labels, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=8)
+    x, y, bw, bh, area = (stats[:, i] for i in (cv2.CC_STAT_LEFT, cv2.CC_STAT_TOP, cv2.CC_STAT_WIDTH,
+                                                cv2.CC_STAT_HEIGHT, cv2.CC_STAT_AREA))
+    thin = EDGE_STRIP_FRAC * side
+    on_border = (x == 0) | (y == 0) | (x + bw == w) | (y + bh == h)
+    edge_strip = on_border & (((bw <= thin) & (bh >= EDGE_STRIP_MIN_LEN * h)) |
+                              ((bh <= thin) & (bw >= EDGE_STRIP_MIN_LEN * w)))
+    mark = (area > SPECK_MAX_AREA) & ~edge_strip
+    mark[0] = False                                    # label 0 is the background
+    glyph_px = max(2, int(round(GLYPH_MIN_FRAC * side)))
+    keep = mark & (np.maximum(bw, bh) >= glyph_px)
+    small = mark & ~keep
+    if small.any():
+        # Group marks closer than a glyph (the letters of a word); a small mark
+        # counts when its group has a glyph or enough other marks.
+        inked = mark[labels]
+        near = cv2.dilate(inked.astype(np.uint8), np.ones((max(1, glyph_px // 2), glyph_px), np.uint8))
+        _, groups = cv2.connectedComponents(near, connectivity=8)
+        group_of = np.zeros(len(mark), np.int32)
+        group_of[labels[inked]] = groups[inked]        # a component lies in one group
+        ids = np.flatnonzero(mark)
+        group = group_of[ids]
+        parts = np.bincount(group)
+        has_glyph = np.bincount(group, weights=keep[ids]) > 0
+        keep[ids] |= (parts[group] >= CLUSTER_MIN_PARTS) | has_glyph[group]
+    if not keep.any():
+        return 0, 0, w, h
+    x0 = int(x[keep].min())
+    y0 = int(y[keep].min())
+    x1 = int((x + bw)[keep].max())
+    y1 = int((y + bh)[keep].max())
+    pad = int(round(side * CROP_MARGIN_FRAC))
+    return max(0, x0 - pad), max(0, y0 - pad), min(w, x1 + pad), min(h, y1 + pad)
+
+
+def _profile_scores(ys: np.ndarray, xs: np.ndarray, angles_deg: np.ndarray) -> np.ndarray:
+    # Projection-profile sharpness for every candidate angle in one bincount:
+    # rotate all ink points, histogram their row coordinate, sum of squares.
+    # Text lines aligned with the x-axis give the peakiest histogram.
+    theta = np.deg2rad(angles_deg)[:, None]
+    rows = ys[None, :] * np.cos(theta) - xs[None, :] * np.sin(theta)
+    rows = np.rint(rows - rows.min(axis=1, keepdims=True)).astype(np.int64)
+    height = int(rows.max()) + 1
+    offsets = (np.arange(len(angles_deg), dtype=np.int64) * height)[:, None]
+    hist = np.bincount((rows + offsets).ravel(), minlength=height * len(angles_deg))
+    hist = hist.reshape(len(angles_deg), height).astype(np.float64)
+    return (hist ** 2).sum(axis=1)
+
+
+def estimate_skew(mask: np.ndarray, max_points: int = 20000) -> Tuple[float, float]:
+    """
+    Returns (angle_deg, line_score). Rotating the page by angle_deg makes text lines
+    horizontal; line_score is best/worst profile sharpness (~1 means no line structure).
+    """
+    ys, xs = np.nonzero(mask)
+    if len(ys) < 50:
+        return 0.0, 1.0
+    if len(ys) > max_points:
+        pick = np.random.default_rng(0).choice(len(ys), max_points, replace=False)
+        ys, xs = ys[pick], xs[pick]
+    ys = ys.astype(np.float64)
+    xs = xs.astype(np.float64)
+
+    coarse = np.arange(-MAX_SKEW_DEG, MAX_SKEW_DEG + 0.5, 1.0)
+    scores = _profile_scores(ys, xs, coarse)
+    best = coarse[int(np.argmax(scores))]
+    fine = np.arange(best - 1.0, best + 1.0 + 1e-9, 0.1)
+    fine_scores = _profile_scores(ys, xs, fine)
+    angle = float(fine[int(np.argmax(fine_scores))])
+    line_score = float(fine_scores.max() / max(scores.min(), 1.0))
+    return angle, line_score
+
+
+def rotate(img: np.ndarray, angle_deg: float) -> np.ndarray:
+    if abs(angle_deg) < 0.05:
+        return img
+    h, w = img.shape[:2]
+    m = cv2.getRotationMatrix2D((w / 2.0, h / 2.0), angle_deg, 1.0)
+    border = (255, 255, 255) if img.ndim == 3 else 255
+    return cv2.warpAffine(img, m, (w, h), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=border)
+
+
+def line_bands(img: np.ndarray, max_bands: int = 8) -> List[Tuple[int, int, int, int]]:
+    """
+    Up to max_bands (x0, y0, x1, y1) boxes around text lines of a deskewed page,
+    taken from the row ink profile. Used for a once-per-page orientation check.
+    """
+    mask = _ink_mask(_to_gray(img))
+    rows = mask.sum(axis=1)
+    on = rows > max(2, 0.02 * mask.shape[1])
+    # run boundaries of consecutive inked rows
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], on.astype(np.int8), [0]))))
+    starts, ends = edges[0::2], edges[1::2]
+    heights = ends - starts
+    keep = (heights >= 8) & (heights <= 0.1 * mask.shape[0])
+    bands = []
+    for y0, y1 in zip(starts[keep], ends[keep]):
+        cols = np.flatnonzero(mask[y0:y1].any(axis=0))
+        if len(cols) == 0:
+            continue
+        h = int(y1 - y0)
+        x0 = int(cols[0])
+        x1 = min(int(cols[-1]) + 1, x0 + 8 * h)  # roughly one word-group, like a detector crop
+        bands.append((x0, int(y0), x1, int(y1)))
+    if len(bands) > max_bands:
+        idx = np.linspace(0, len(bands) - 1, max_bands).round().astype(int)
+        bands = [bands[i] for i in idx]
+    return bands
+
+
+def _photometric(img: np.ndarray, denoise: bool, binarize: bool) -> np.ndarray:
+    img = np.ascontiguousarray(img)
+    if denoise:
+        img = cv2.medianBlur(img, 3)
+    if binarize:
+        g = _to_gray(img)
+        block = max(15, (min(g.shape) // 40) | 1)
+        g = cv2.adaptiveThreshold(g, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                  cv2.THRESH_BINARY, block, 10)
+        img = cv2.cvtColor(g, cv2.COLOR_GRAY2RGB)
+    return img
+
+
+def preprocess_page(img: np.ndarray, crop: bool = True, deskew: bool = True,
+                    binarize: bool = False, denoise: bool = False) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    img: HxWx3 RGB uint8. Returns (processed HxWx3 RGB uint8, info).
+    info['upright'] is True when the page has clear, horizontal line structure after
+    deskewing; the caller may then skip PaddleOCR's per-line angle classifier.
+    """
+    h, w = img.shape[:2]
+    gray = _to_gray(img)
+    scale = min(1.0, ANALYSIS_MAX_SIDE / float(max(h, w)))
+    small = cv2.resize(gray, (max(1, int(w * scale)), max(1, int(h * scale))),
+                       interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+    mask = _ink_mask(small)
+
+    x0, y0, x1, y1 = 0, 0, w, h
+    if crop and mask.any():
+        sx0, sy0, sx1, sy1 = content_bbox(mask)
+        x0, y0 = int(sx0 / scale), int(sy0 / scale)
+        x1, y1 = min(w, int(np.ceil(sx1 / scale))), min(h, int(np.ceil(sy1 / scale)))
+        mask = mask[sy0:sy1, sx0:sx1]
+        img = img[y0:y1, x0:x1]
+
+    angle, line_score = estimate_skew(mask) if deskew else (0.0, 1.0)
+    img = rotate(img, angle)
+
+    img = _photometric(img, denoise, binarize)
+    out_h, out_w = img.shape[:2]
+    info = {
+        "orig_size": [w, h],
+        "size": [out_w, out_h],
+        "crop": [x0, y0, x1, y1],
+        "angle": round(angle, 2),
+        "line_score": round(line_score, 2),
+        "upright": bool(deskew and line_score >= UPRIGHT_MIN_LINE_SCORE),
+        "pixels_saved": int(w * h - out_w * out_h),
+        "binarized": binarize,
+        "denoised": denoise,
+    }
+    return img, info
+
+
+def unmap_box(box, info: Optional[Dict[str, Any]], scale: float = 1.0) -> np.ndarray:
+    """
+    Inverse of the crop/rotation/flip recorded in `info` (from preprocess_page, or None
+    when the page was not preprocessed): maps a 4-point box found on the processed page
+    onto the original page, then scales it onto a render `scale` times larger.
+    Returns float32 (4, 2) in the same point order, so crop_quad still yields an
+    upright line.
+    """
+    pts = np.asarray(box, dtype=np.float64).reshape(4, 2)
+    if info is not None:
+        x0, y0, x1, y1 = info["crop"]
+        w, h = x1 - x0, y1 - y0
+        if info.get("flipped"):
+            pts = np.array([w - 1, h - 1], dtype=np.float64) - pts
+        if abs(info["angle"]) >= 0.05:
+            inv = cv2.invertAffineTransform(cv2.getRotationMatrix2D((w / 2.0, h / 2.0), info["angle"], 1.0))
+            pts = pts @ inv[:, :2].T + inv[:, 2]
+        pts = pts + (x0, y0)
+    # pixel-centre coordinates, as cv2 and the flip above use them
+    return ((pts + 0.5) * scale - 0.5).astype(np.float32)
+
+
+def replay_photometric(img: np.ndarray, info: Dict[str, Any]) -> np.ndarray:
+    """Applies the denoise/binarize steps recorded in `info` to another render (or part) of the page."""
+    return _photometric(img, info.get("denoised", False), info.get("binarized", False))
+
+
+def crop_quad(img: np.ndarray, box) -> np.ndarray:
+    """Perspective-crops a 4-point text box (PaddleOCR order) into an upright line image."""
+    pts = np.asarray(box, dtype=np.float32).reshape(4, 2)
+    w = int(max(np.linalg.norm(pts[0] - pts[1]), np.linalg.norm(pts[2] - pts[3])))
+    h = int(max(np.linalg.norm(pts[0] - pts[3]), np.linalg.norm(pts[1] - pts[2])))
+    w, h = max(w, 1), max(h, 1)
+    dst = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    m = cv2.getPerspectiveTransform(pts, dst)
+    out = cv2.warpPerspective(img, m, (w, h), borderMode=cv2.BORDER_REPLICATE,
+                              flags=cv2.INTER_CUBIC)
+    if h / float(w) >= 1.5:
+        out = np.rot90(out)
+    return np.ascontiguousarray(out)
@@ -0,0 +1,93 @@
+# summarizer/singleflight.py
+# Request coalescing + bounded TTL cache in front of the LLM calls. Identical
+# prompts (duplicate uploads, retries) arriving while one call is in flight wait
+# for that call instead of paying LLM latency and cost again.
+import copy, hashlib, json, threading, time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+
+
+class SingleFlight:
+    """
+    do(key, fn): returns a cached result for `key` if fresh, else joins an in-flight
+    call for `key`, else runs fn(). Results for which `cacheable(result)` is true are
+    kept for `ttl` seconds in an LRU of at most `maxsize` entries (ttl <= 0 disables
+    caching but keeps coalescing). Callers always get their own deep copy.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 600.0):
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = float(ttl)
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()   # key -> (expires_at, result)
+        self._inflight: Dict[str, Future] = {}
+        self.stats = {"calls": 0, "cache_hits": 0, "coalesced": 0, "executed": 0, "errors": 0, "evictions": 0}
+
+    def do(self, key: str, fn: Callable[[], Any], cacheable: Callable[[Any], bool] = lambda r: True) -> Any:
+        with self._lock:
+            self.stats["calls"] += 1
+            entry = self._cache.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._cache.move_to_end(key)
+                    self.stats["cache_hits"] += 1
+                    return copy.deepcopy(entry[1])
+                del self._cache[key]
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[key] = fut
+                self.stats["executed"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            return copy.deepcopy(fut.result())
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self.stats["errors"] += 1
+                del self._inflight[key]
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            if self.ttl > 0 and self.maxsize and cacheable(result):
+                self._cache[key] = (time.monotonic() + self.ttl, result)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+                    self.stats["evictions"] += 1
+            del self._inflight[key]
+        fut.set_result(result)
+        return copy.deepcopy(result)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "cached": len(self._cache), "inflight": len(self._inflight),
+                    "maxsize": self.maxsize, "ttl": self.ttl}
+
+
+def prompt_key(prompt: str, **params: Any) -> str:
+    """sha256 over the exact prompt text and the model parameters that affect the output."""
+    payload = json.dumps({"prompt": prompt, "params": params}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_LLM_FLIGHT: Optional[SingleFlight] = None
+_LLM_FLIGHT_LOCK = threading.Lock()
+
+
+def llm_flight() -> SingleFlight:
+    """Process-wide SingleFlight shared by llm.summarize and llm_hf.summarize."""
+    global _LLM_FLIGHT
+    with _LLM_FLIGHT_LOCK:
+        if _LLM_FLIGHT is None:
+            _LLM_FLIGHT = SingleFlight(maxsize=getattr(settings, "LLM_CACHE_SIZE", 256),
+                                       ttl=getattr(settings, "LLM_CACHE_TTL", 600))
+        return _LLM_FLIGHT
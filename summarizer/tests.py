@@ -0,0 +1,349 @@
+# summarizer/tests.py
+import threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from .batching import RecognitionBatcher
+from .meds import MedIndex, normalize_meds, parse_dose, parse_freq
+from .ocr import _reocr_regions
+from .preprocess import content_bbox, unmap_box
+from .singleflight import SingleFlight, prompt_key
+
+
+class RecognitionBatcherTests(SimpleTestCase):
+    def make(self, max_batch=64, max_wait_ms=5, fail_on=None, classify=True):
+        self.batches, self.classified = [], []
+
+        def recognize(crops):
+            self.assertTrue(batcher.lock.locked())
+            self.batches.append(list(crops))
+            if fail_on in crops:
+                raise ValueError(fail_on)
+            return [(f"text:{c}", 0.9) for c in crops]
+
+        def rotate(crops):
+            self.classified.extend(crops)
+            return [f"{c}'" for c in crops]
+
+        batcher = RecognitionBatcher(recognize, rotate if classify else None,
+                                     max_batch=max_batch, max_wait_ms=max_wait_ms)
+        return batcher
+
+    def test_results_in_submission_order(self):
+        batcher = self.make()
+        requests = [[f"{r}.{i}" for i in range(r % 7)] for r in range(40)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(batcher.recognize, requests))
+        for crops, res in zip(requests, results):
+            self.assertEqual(res, [(f"text:{c}", 0.9) for c in crops])
+        self.assertEqual(batcher.stats["crops"], sum(map(len, requests)))
+
+    def test_request_larger_than_max_batch(self):
+        batcher = self.make(max_batch=4)
+        crops = [str(i) for i in range(10)]
+        self.assertEqual(batcher.recognize(crops), [(f"text:{c}", 0.9) for c in crops])
+        self.assertEqual([len(b) for b in self.batches], [4, 4, 2])
+
+    def test_mixed_cls_flags(self):
+        batcher = self.make()
+        with batcher.lock:   # hold the engine so both requests land in one batch
+            plain = batcher.submit(["a", "b"], cls=False)
+            rotated = batcher.submit(["c"], cls=True)
+            tail = batcher.submit(["d"], cls=False)
+        self.assertEqual(plain.result(), [("text:a", 0.9), ("text:b", 0.9)])
+        self.assertEqual(rotated.result(), [("text:c'", 0.9)])
+        self.assertEqual(tail.result(), [("text:d", 0.9)])
+        self.assertEqual(self.classified, ["c"])
+        self.assertEqual(self.batches, [["a", "b", "c'", "d"]])
+
+    def test_cls_without_classifier(self):
+        batcher = self.make(classify=False)
+        self.assertEqual(batcher.recognize(["a"], cls=True), [("text:a", 0.9)])
+
+    def test_error_propagates_and_worker_survives(self):
+        batcher = self.make(fail_on="bad")
+        with batcher.lock:
+            failed = [batcher.submit(["x", "bad"]), batcher.submit(["y"])]
+        for fut in failed:
+            with self.assertRaises(ValueError):
+                fut.result(timeout=5)
+        self.assertEqual(batcher.recognize(["z"]), [("text:z", 0.9)])
+
+    def test_empty_request(self):
+        batcher = self.make()
+        self.assertEqual(batcher.recognize([]), [])
+        self.assertEqual(self.batches, [])
+
+
+class ReocrGeometryTests(SimpleTestCase):
+    BOX = [[10, 20], [110, 20], [110, 40], [10, 40]]
+
+    def test_unmap_box_without_preprocessing_scales(self):
+        self.assertEqual(unmap_box(self.BOX, None, 2.0).tolist(),
+                         [[20.5, 40.5], [220.5, 40.5], [220.5, 80.5], [20.5, 80.5]])
+
+    def test_unmap_box_undoes_crop_and_flip(self):
+        info = {"crop": [100, 50, 300, 250], "angle": 0.0, "flipped": True}
+        self.assertEqual(unmap_box(self.BOX, info).tolist(),
+                         [[289, 229], [189, 229], [189, 209], [289, 209]])
+
+    def test_unmap_box_undoes_rotation(self):
+        info = {"crop": [0, 0, 200, 100], "angle": 90.0}
+        # rotate() turned the page 90 degrees counter-clockwise about its centre
+        center = unmap_box([[100, 50]] * 4, info)
+        self.assertTrue(np.allclose(center, [[100, 50]] * 4, atol=1e-4))
+        self.assertTrue(np.allclose(unmap_box([[100, 0]] * 4, info), [[150, 50]] * 4, atol=1e-4))
+
+    def test_regions_merge_nearby_lines(self):
+        rects = [[0, 100, 50, 110], [0, 0, 80, 10], [10, 15, 60, 25]]
+        self.assertEqual(_reocr_regions(rects, gap=10),
+                         [([0, 0, 80, 25], [1, 2]), ([0, 100, 50, 110], [0])])
+
+    def test_regions_capped(self):
+        rects = [[0, y, 10, y + 5] for y in range(0, 500, 100)]
+        self.assertEqual(_reocr_regions(rects, gap=1), [([0, 0, 10, 405], [0, 1, 2, 3, 4])])
+
+
+class ContentBboxTests(SimpleTestCase):
+    # Analysis-scale masks: 1200 px long side, so glyphs are >= 6 px.
+    def page(self):
+        mask = np.zeros((1200, 900), bool)
+        mask[300:700:20, 200:500] = True                # text lines
+        mask[300:700:20, 200:500:7] = False             # split into word-sized marks
+        return mask
+
+    def test_ignores_isolated_specks(self):
+        mask = self.page()
+        for y, x in [(50, 60), (1100, 850), (900, 100), (150, 700)]:
+            mask[y:y + 3, x:x + 3] = True               # ~0.5 mm dust at 300 DPI
+        self.assertEqual(content_bbox(mask), content_bbox(self.page()))
+
+    def test_ignores_scanner_edge_strips(self):
+        mask = self.page()
+        mask[:, 30:40] = True                           # shadow edge off the left border
+        mask[0:8, 100:800] = True                       # strip along the top
+        self.assertEqual(content_bbox(mask), content_bbox(self.page()))
+
+    def test_keeps_glyph_sized_flag_and_small_print(self):
+        mask = self.page()
+        mask[400:410, 800:808] = True                   # lone "H" flag
+        for x in range(300, 330, 6):
+            mask[1000:1004, x:x + 3] = True             # word of small lowercase letters
+        x0, y0, x1, y1 = content_bbox(mask)
+        self.assertGreaterEqual(x1, 808)
+        self.assertGreaterEqual(y1, 1004)
+
+
+class MedIndexTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.index = MedIndex.from_file(settings.MED_VOCAB_PATH)
+
+    def canonical(self, name):
+        hit = self.index.lookup(name)
+        return hit and hit["canonical"]
+
+    def test_exact_aliases(self):
+        self.assertEqual(self.canonical("Crocin"), "paracetamol")
+        self.assertEqual(self.canonical("Tab. Glycomet 500mg"), "metformin")
+        self.assertEqual(self.canonical("Vitamin D3"), "cholecalciferol")
+        self.assertEqual(self.canonical("Vitamin B12"), "cyanocobalamin")
+
+    def test_near_miss_spellings_match(self):
+        for name, canon in [("paracetmol", "paracetamol"), ("Paracetamo1", "paracetamol"),
+                            ("arnlodipine", "amlodipine"), ("metformine", "metformin"),
+                            ("Atorvastatine", "atorvastatin"), ("pantoprazol", "pantoprazole"),
+                            ("insulin glargin", "insulin glargine")]:
+            self.assertEqual(self.canonical(name), canon, name)
+
+    def test_distinct_drugs_do_not_match(self):
+        for name in ["lorazepam", "prednisone", "vitamin c", "vitamin b6", "ferrous fumarate"]:
+            self.assertIsNone(self.index.lookup(name), name)
+
+    def test_ambiguous_candidates_do_not_match(self):
+        index = MedIndex([("hydroxyzine", []), ("hydralazine", [])])
+        self.assertEqual(index.lookup("hydroxyzin")["canonical"], "hydroxyzine")
+        self.assertIsNone(index.lookup("hydrazine"))
+
+    def test_combination_returns_every_ingredient(self):
+        for name in ["Amlodipine + Telmisartan", "Telmisartan/Amlodipine"]:
+            hit = self.index.lookup(name)
+            self.assertEqual(hit["canonical"], "amlodipine + telmisartan", name)
+            self.assertEqual(hit["ingredients"], ["amlodipine", "telmisartan"])
+            self.assertEqual(hit["method"], "combination")
+        self.assertEqual(self.canonical("Losartan Atenolol"), "atenolol + losartan")
+        self.assertEqual(self.canonical("Metformin hydrochloride"), "metformin")
+
+
+class NormalizeMedsTests(SimpleTestCase):
+    def test_records(self):
+        index = MedIndex([("metformin", ["glycomet"]), ("amlodipine", []), ("telmisartan", ["telma"])])
+        meds = [
+            {"name": "Glycomet 500mg", "dose": "", "freq": "1-0-1"},
+            "not a med",
+            {"name": "Telma AM", "dose": "40 mg", "freq": "once daily"},
+            {"name": "Amlodipine + Telmisartan", "dose": "5/40 mg", "freq": "OD"},
+            {"name": "Unknownium", "dose": "1,000 mg", "freq": "SOS"},
+        ]
+        out = normalize_meds(meds, index=index)
+        self.assertEqual([r["canonical"] for r in out],
+                         ["metformin", "telmisartan", "amlodipine + telmisartan", None])
+        self.assertEqual(out[0]["dose_value"], 500.0)
+        self.assertEqual((out[0]["freq_code"], out[0]["per_day"]), ("1-0-1", 2.0))
+        self.assertEqual(out[2]["ingredients"], ["amlodipine", "telmisartan"])
+        self.assertEqual((out[3]["match_score"], out[3]["match_method"], out[3]["ingredients"]), (0.0, None, []))
+        self.assertEqual((out[3]["dose_value"], out[3]["prn"]), (1000.0, True))
+
+
+class ParseDoseTests(SimpleTestCase):
+    def test_mass_normalized_to_mg(self):
+        self.assertEqual(parse_dose("500 mg"), {"dose_value": 500.0, "dose_unit": "mg"})
+        self.assertEqual(parse_dose("250mcg"), {"dose_value": 0.25, "dose_unit": "mg"})
+        self.assertEqual(parse_dose("1 g"), {"dose_value": 1000.0, "dose_unit": "mg"})
+
+    def test_percent(self):
+        self.assertEqual(parse_dose("1% cream"), {"dose_value": 1.0, "dose_unit": "%"})
+        self.assertEqual(parse_dose("5 %"), {"dose_value": 5.0, "dose_unit": "%"})
+        self.assertEqual(parse_dose("0.1%"), {"dose_value": 0.1, "dose_unit": "%"})
+
+    def test_thousands_separator(self):
+        self.assertEqual(parse_dose("1,000 mg"), {"dose_value": 1000.0, "dose_unit": "mg"})
+        self.assertEqual(parse_dose("10,000 IU"), {"dose_value": 10000.0, "dose_unit": "units"})
+        self.assertEqual(parse_dose("1,5 mg"), {"dose_value": None, "dose_unit": None})
+
+    def test_unit_must_end_the_token(self):
+        self.assertEqual(parse_dose("Metformin 500mg tab"), {"dose_value": 500.0, "dose_unit": "mg"})
+        self.assertEqual(parse_dose("10 units"), {"dose_value": 10.0, "dose_unit": "units"})
+        self.assertEqual(parse_dose("2 gummies"), {"dose_value": None, "dose_unit": None})
+        self.assertEqual(parse_dose(""), {"dose_value": None, "dose_unit": None})
+
+
+class ParseFreqTests(SimpleTestCase):
+    def assertFreq(self, text, code, per_day, prn=False):
+        self.assertEqual(parse_freq(text), {"freq_code": code, "per_day": per_day, "prn": prn}, text)
+
+    def test_count_per_period(self):
+        self.assertFreq("2 times a day", "BID", 2.0)
+        self.assertFreq("3 times daily", "TID", 3.0)
+        self.assertFreq("twice weekly", "2X/WK", 0.286)
+        self.assertFreq("once in 2 days", "Q2D", 0.5)
+        self.assertFreq("once a week", "WEEKLY", 0.143)
+        self.assertFreq("once every 2 weeks", "Q14D", 0.071)
+        self.assertFreq("1x/day", "QD", 1.0)
+        self.assertFreq("5 times per day", "5X/D", 5.0)
+        self.assertFreq("three times a week", "3X/WK", 0.429)
+
+    def test_keywords(self):
+        self.assertFreq("BID", "BID", 2.0)
+        self.assertFreq("t.i.d.", "TID", 3.0)
+        self.assertFreq("once daily", "QD", 1.0)
+        self.assertFreq("at bedtime", "HS", 1.0)
+        self.assertFreq("twice", "BID", 2.0)
+
+    def test_grid_and_hours(self):
+        self.assertFreq("1-0-1", "1-0-1", 2.0)
+        self.assertFreq("1-0-1 daily", "1-0-1", 2.0)
+        self.assertFreq("2-0-2", "2-0-2", 2.0)
+        self.assertFreq("1/2-0-1/2", "0.5-0-0.5", 2.0)
+        self.assertFreq("½-0-½", "0.5-0-0.5", 2.0)
+        self.assertFreq("1-1-1-1", "1-1-1-1", 4.0)
+        self.assertFreq("11/2-0-1", None, None)
+        self.assertFreq("every 8 hours", "Q8H", 3.0)
+
+    def test_prn(self):
+        self.assertFreq("every 6 hours as needed", "Q6H", 4.0, prn=True)
+        self.assertFreq("SOS", None, None, prn=True)
+
+    def test_ambiguous_is_none(self):
+        self.assertFreq("twice a day or 3 times a day", None, None)
+        self.assertFreq("0 times a day", None, None)
+        self.assertFreq("", None, None)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_callers_share_one_call(self):
+        flight, calls, started, release = SingleFlight(), [], threading.Event(), threading.Event()
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"summary": "x"}
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            leader = pool.submit(flight.do, "k", slow)
+            started.wait(5)
+            followers = [pool.submit(flight.do, "k", slow) for _ in range(4)]
+            while flight.snapshot()["coalesced"] < 4:
+                time.sleep(0.001)
+            release.set()
+            results = [leader.result()] + [f.result() for f in followers]
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"summary": "x"}] * 5)
+        self.assertEqual(len({id(r) for r in results}), 5)   # each caller gets its own copy
+        self.assertEqual(flight.snapshot()["executed"], 1)
+
+    def test_cache_hit_returns_copy(self):
+        flight = SingleFlight()
+        first = flight.do("k", lambda: {"meds": []})
+        first["meds"].append("mutated")
+        self.assertEqual(flight.do("k", lambda: {"meds": ["other"]}), {"meds": []})
+        self.assertEqual(flight.stats["cache_hits"], 1)
+
+    def test_uncacheable_and_errors_are_not_kept(self):
+        flight = SingleFlight()
+        flight.do("k", lambda: {"error": "timeout"}, cacheable=lambda r: not r.get("error"))
+        self.assertEqual(flight.do("k", lambda: {"ok": 1}), {"ok": 1})
+
+        def boom():
+            raise RuntimeError("llm down")
+        with self.assertRaises(RuntimeError):
+            flight.do("e", boom)
+        self.assertEqual(flight.do("e", lambda: 2), 2)
+        self.assertEqual(flight.snapshot()["inflight"], 0)
+
+    def test_error_reaches_coalesced_callers(self):
+        flight, started, release = SingleFlight(), threading.Event(), threading.Event()
+
+        def fail():
+            started.set()
+            release.wait(5)
+            raise RuntimeError("llm down")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(flight.do, "k", fail)
+            started.wait(5)
+            follower = pool.submit(flight.do, "k", fail)
+            while flight.snapshot()["coalesced"] < 1:
+                time.sleep(0.001)
+            release.set()
+            for fut in (leader, follower):
+                with self.assertRaises(RuntimeError):
+                    fut.result()
+        self.assertEqual(flight.stats["errors"], 1)
+
+    def test_ttl_expiry(self):
+        flight = SingleFlight(ttl=0.05)
+        flight.do("k", lambda: 1)
+        time.sleep(0.06)
+        self.assertEqual(flight.do("k", lambda: 2), 2)
+        self.assertEqual(SingleFlight(ttl=0).do("k", lambda: 3), 3)
+
+    def test_lru_eviction(self):
+        flight = SingleFlight(maxsize=2)
+        for key in ("a", "b"):
+            flight.do(key, lambda: key)
+        flight.do("a", lambda: "new")          # touch "a"; "b" is now least recent
+        flight.do("c", lambda: "c")
+        self.assertEqual(flight.stats["evictions"], 1)
+        self.assertEqual(flight.do("a", lambda: "new"), "a")
+        self.assertEqual(flight.do("b", lambda: "new"), "new")
+
+    def test_prompt_key(self):
+        self.assertEqual(prompt_key("p", model="m", temperature=0.2), prompt_key("p", temperature=0.2, model="m"))
+        self.assertNotEqual(prompt_key("p", model="m"), prompt_key("p", model="m2"))
+        self.assertNotEqual(prompt_key("p", model="m"), prompt_key("p ", model="m"))
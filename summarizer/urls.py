@@ -5,4 +5,6 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('docs/<uuid:pk>/', views.detail, name='detail'),
     path('docs/<uuid:pk>/json/', views.download_json, name='download_json'),
+    path('docs/<uuid:pk>/search/', views.search, name='search'),
+    path('metrics/llm/', views.llm_metrics, name='llm_metrics'),
 ]
@@ -1,8 +1,10 @@
 import os, uuid, io, re, json, math
-from typing import List, Dict, Any, Tuple
-from PIL import Image
-from pdf2image import convert_from_path
-from pypdf import PdfReader
+from typing import List, Dict, Any, Tuple, TYPE_CHECKING
+
+# PIL / pdf2image / pypdf are imported inside the helpers that need them so that
+# web workers importing chunk_text() don't load the imaging stack.
+if TYPE_CHECKING:
+    from PIL import Image
 
 IMG_EXTS = {'.png','.jpg','.jpeg','.tiff','.bmp','.webp'}
 PDF_EXTS = {'.pdf'}
@@ -13,11 +15,27 @@ def is_pdf(path: str) -> bool:
 def is_image(path: str) -> bool:
     return os.path.splitext(path.lower())[1] in IMG_EXTS
 
-def pdf_to_images(pdf_path: str, dpi: int = 300) -> List[Image.Image]:
+def pdf_to_images(pdf_path: str, dpi: int = 300) -> List["Image.Image"]:
+    from pdf2image import convert_from_path
     pages = convert_from_path(pdf_path, dpi=dpi, fmt='png')
     return pages
 
-def image_from_file(path: str) -> Image.Image:
+def pdf_page_region(pdf_path: str, page: int, dpi: int, x: int, y: int, w: int, h: int) -> "Image.Image":
+    # Renders only the w x h pixel rectangle at (x, y) of one page at `dpi`
+    # (pdftoppm -x/-y/-W/-H; pdf2image has no option for it). page is 1-based.
+    import subprocess, tempfile
+    from PIL import Image
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'region')
+        subprocess.run(['pdftoppm', '-f', str(page), '-l', str(page), '-r', str(dpi),
+                        '-x', str(x), '-y', str(y), '-W', str(w), '-H', str(h),
+                        '-png', '-singlefile', pdf_path, root],
+                       check=True, capture_output=True)
+        with Image.open(root + '.png') as im:
+            return im.convert('RGB')
+
+def image_from_file(path: str) -> "Image.Image":
+    from PIL import Image
     return Image.open(path).convert('RGB')
 
 def approx_token_len(text: str) -> int:
@@ -43,6 +61,7 @@ def chunk_text(text: str, max_tokens: int = 800) -> List[str]:
 
 def extract_pdf_metadata(pdf_path: str) -> Dict[str, Any]:
     try:
+        from pypdf import PdfReader
         reader = PdfReader(pdf_path)
         meta = reader.metadata or {}
         return {
@@ -1,4 +1,4 @@
-import os, json, uuid, io
+import os, json, uuid, io, time
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse, HttpResponse
 from django.urls import reverse
@@ -6,23 +6,23 @@ from django.conf import settings
 
 from .forms import UploadForm
 from .models import Document
-from .ocr import ocr_file
 from .postprocess import redact_phi
 from .utils import chunk_text
-from .llm import summarize
+from . import evidence
+from .meds import normalize_meds
+from .singleflight import llm_flight
 
-from django.conf import settings
-# ...
-if settings.LLM_PROVIDER == 'hf':
-    from .llm_hf import summarize as summarize_fn
-else:
-    from .llm import summarize as summarize_fn
+# NOTE: .ocr (paddleocr/paddle/numpy/PIL) and the LLM clients are imported
+# inside home() only. Importing them here would make every web worker,
+# manage.py command and migration pay for the OCR stack on startup.
+# `python manage.py bench_startup` guards this.
 
-# summarizer/views.py (inside home view)
 import traceback
 import logging
 logger = logging.getLogger(__name__)
 
+CHUNK_MAX_TOKENS = 800
+
 def _fail_json(msg, code):
     return {
         "summary": msg,
@@ -44,6 +44,7 @@ def home(request):
             doc.status = 'uploaded'
             doc.save()
             try:
+                from .ocr import ocr_file
                 fullpath = doc.uploaded_file.path
 
                 # 1) OCR
@@ -65,12 +66,14 @@ def home(request):
                     return redirect('detail', pk=doc.id)
 
                 # 2) Chunk
-                chunks = chunk_text(redacted, max_tokens=800)
+                chunks = chunk_text(redacted, max_tokens=CHUNK_MAX_TOKENS)
                 if not chunks:
                     doc.summary_json = _fail_json("Text parsed but chunking produced no chunks.", "empty_chunks")
                     doc.status = 'processed'
                     doc.save()
                     return redirect('detail', pk=doc.id)
+                doc.chunks = chunks
+                doc.chunk_index = evidence.build_index(chunks)
 
                 # 3) LLM (OpenAI or HF)
                 from django.conf import settings
@@ -92,8 +95,11 @@ def home(request):
                     "disclaimer": result.get("disclaimer", "This is not a medical diagnosis."),
                     "error": result.get("error", "") or ""
                 }
+                # flag claims whose cited chunks don't contain them
+                result["source_spans"] = evidence.verify_source_spans(doc.chunk_index, result["source_spans"])
 
                 doc.summary_json = result
+                doc.meds_normalized = normalize_meds(result["meds"])
                 doc.status = 'processed' if not result.get("error") else 'failed'
                 doc.save()
                 return redirect('detail', pk=doc.id)
@@ -125,3 +131,32 @@ def download_json(request, pk):
     filename = f"summary_{pk}.json"
     resp['Content-Disposition'] = f'attachment; filename="{filename}"'
     return resp
+
+def _ensure_index(doc: Document) -> None:
+    # Documents processed before the evidence index existed: rebuild from the stored
+    # OCR text (chunk_text is deterministic, so chunk ids match the summary's).
+    if doc.chunk_index or not doc.ocr_text:
+        return
+    doc.chunks = chunk_text(doc.ocr_text, max_tokens=CHUNK_MAX_TOKENS)
+    doc.chunk_index = evidence.build_index(doc.chunks)
+    doc.save(update_fields=['chunks', 'chunk_index'])
+
+def search(request, pk):
+    doc = get_object_or_404(Document.objects.only('id', 'ocr_text', 'chunks', 'chunk_index'), pk=pk)
+    _ensure_index(doc)
+    q = request.GET.get('q', '').strip()
+    try:
+        k = max(1, min(int(request.GET.get('k', 5)), 50))
+    except ValueError:
+        k = 5
+    t0 = time.perf_counter()
+    hits = evidence.search(doc.chunk_index, q, k=k) if q else []
+    took_ms = (time.perf_counter() - t0) * 1000
+    for h in hits:
+        h["snippet"] = doc.chunks[h["chunk_id"] - 1][:300]
+    return JsonResponse({"query": q, "hits": hits, "took_ms": round(took_ms, 3)},
+                        json_dumps_params={"ensure_ascii": False})
+
+def llm_metrics(request):
+    # Per-process counters of the LLM single-flight layer (coalesced calls, cache hits)
+    return JsonResponse(llm_flight().snapshot())